@@ -20,29 +20,37 @@ from full_autonomy import FullAutonomy
 from advanced_perception import AdvancedPerception
 from ethical_intelligence_module import EthicalIntelligenceModule
 from system_control import SystemControl
+from model_loader import StartupProfiler
+from stage_scheduler import StageScheduler
 
 class M1:
-    def __init__(self):
-        self.memory_system = MemorySystem()
-        self.data_processor = DataProcessor()
-        self.reasoning_core = ReasoningCore()
-        self.auto_architecture_tuner = AutoArchitectureTuner(self)
-        self.ai_fusion_engine = AIFusionEngine()
-        self.quantum_ai_adaptability = QuantumAIAdaptability()
-        self.meta_learning_algorithm = MetaLearningAlgorithm()
-        self.ethical_intelligence = EthicalIntelligence()
-        self.file_system = FileSystem()
-        self.ai_chronicle_system = AIChronicleSystem()
-        self.recursive_self_improvement = RecursiveSelfImprovement()
-        self.self_enhancing_upgrades = SelfEnhancingUpgrades()
-        self.multi_agent_ai_fusion = MultiAgentAIFusion()
-        self.memory_management = MemoryManagement()
-        self.full_autonomy = FullAutonomy(self)
-        self.advanced_perception = AdvancedPerception(self)
-        self.ethical_intelligence_module = EthicalIntelligenceModule()
-        self.system_control = SystemControl(self)
+    def __init__(self, lazy=False):
+        self.lazy = lazy
+        self.startup_profiler = StartupProfiler()
+        build = self.startup_profiler.build
+        self.memory_system = build('memory_system', MemorySystem)
+        self.data_processor = build('data_processor', DataProcessor)
+        self.reasoning_core = build('reasoning_core', ReasoningCore)
+        self.auto_architecture_tuner = build('auto_architecture_tuner', lambda: AutoArchitectureTuner(self))
+        self.ai_fusion_engine = build('ai_fusion_engine', AIFusionEngine)
+        self.quantum_ai_adaptability = build('quantum_ai_adaptability', QuantumAIAdaptability)
+        self.meta_learning_algorithm = build('meta_learning_algorithm', MetaLearningAlgorithm)
+        self.ethical_intelligence = build('ethical_intelligence', EthicalIntelligence)
+        self.file_system = build('file_system', FileSystem)
+        self.ai_chronicle_system = build('ai_chronicle_system', AIChronicleSystem)
+        self.recursive_self_improvement = build('recursive_self_improvement', lambda: RecursiveSelfImprovement(lazy=lazy))
+        self.self_enhancing_upgrades = build('self_enhancing_upgrades', SelfEnhancingUpgrades)
+        self.multi_agent_ai_fusion = build('multi_agent_ai_fusion', MultiAgentAIFusion)
+        self.memory_management = build('memory_management', MemoryManagement)
+        self.full_autonomy = build('full_autonomy', lambda: FullAutonomy(self, lazy=lazy))
+        self.advanced_perception = build('advanced_perception', lambda: AdvancedPerception(self, lazy=lazy))
+        self.ethical_intelligence_module = build('ethical_intelligence_module', EthicalIntelligenceModule)
+        self.system_control = build('system_control', lambda: SystemControl(self))
         logging.basicConfig(filename='M1.log', level=logging.INFO)
 
+    def startup_report(self):
+        return self.startup_profiler.log_report()
+
     def initialize(self):
         self._load_custom_model()
         self._load_additional_models()
@@ -67,24 +75,35 @@ class M1:
         self.system_control.initialize()
         logging.info("M1 initialization complete.")
 
-    def run(self):
-        self.recursive_self_improvement.analyze_and_improve()
-        self.memory_management.optimize_memory()
-        self.full_autonomy.execute()
-        self.advanced_perception.execute()
-        self.reasoning_core.plan()
-        self.data_processor.process_data()
-        self.auto_architecture_tuner.continuous_tuning()
-        self.ai_fusion_engine.integrate_knowledge("Sample text for integration")
-        self.quantum_ai_adaptability.adapt()
-        self.meta_learning_algorithm.optimize_learning()
-        self.ethical_intelligence.apply_ethics({"situation": "Example"})
-        self.file_system.save_file("test.txt", "This is a test.")
-        self.ai_chronicle_system.document_evolution("Initial run complete.")
-        self.self_enhancing_upgrades.modify_architecture()
-        self.multi_agent_ai_fusion.fuse_models("Sample text for fusion")
-        self.system_control.execute()
-        logging.info("M1 run completed successfully.")
+    def run(self, max_workers=None, stage_timeout=None):
+        scheduler = StageScheduler(max_workers=max_workers, default_timeout=stage_timeout)
+        # The stages do not pass data to each other, so none of them declares a dependency.
+        scheduler.add_method_stage('self_improvement', self.recursive_self_improvement, 'analyze_and_improve')
+        scheduler.add_method_stage('memory_optimization', self.memory_management, 'optimize_memory')
+        scheduler.add_method_stage('autonomy', self.full_autonomy, 'execute')
+        scheduler.add_method_stage('perception', self.advanced_perception, 'execute')
+        scheduler.add_method_stage('planning', self.reasoning_core, 'plan')
+        scheduler.add_method_stage('data_processing', self.data_processor, 'process_data')
+        scheduler.add_method_stage('architecture_tuning', self.auto_architecture_tuner, 'continuous_tuning')
+        scheduler.add_method_stage('knowledge_fusion', self.ai_fusion_engine, 'integrate_knowledge',
+                                   args=("Sample text for integration",))
+        scheduler.add_method_stage('quantum_adaptation', self.quantum_ai_adaptability, 'adapt')
+        scheduler.add_method_stage('meta_learning', self.meta_learning_algorithm, 'optimize_learning')
+        scheduler.add_method_stage('ethics', self.ethical_intelligence, 'apply_ethics', args=({"situation": "Example"},))
+        scheduler.add_method_stage('file_io', self.file_system, 'save_file', args=("test.txt", "This is a test."))
+        scheduler.add_method_stage('chronicle', self.ai_chronicle_system, 'document_evolution',
+                                   args=("Initial run complete.",))
+        scheduler.add_method_stage('architecture_upgrades', self.self_enhancing_upgrades, 'modify_architecture')
+        scheduler.add_method_stage('multi_agent_fusion', self.multi_agent_ai_fusion, 'fuse_models',
+                                   args=("Sample text for fusion",))
+        scheduler.add_method_stage('system_control', self.system_control, 'execute')
+        report = scheduler.run()
+        failed = [name for name, entry in report["stages"].items() if entry["status"] != "completed"]
+        if failed:
+            logging.error(f"M1 run finished with incomplete stages: {', '.join(failed)}")
+        else:
+            logging.info("M1 run completed successfully.")
+        return report
 
     def benchmark_performance(self):
         performance_score = self.recursive_self_improvement.benchmark_performance()
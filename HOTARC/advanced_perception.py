@@ -1,17 +1,23 @@
-from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 import whisper
 import cv2
 import numpy as np
 import logging
 from scipy.stats import norm
+from model_loader import LazyModel
+from model_registry import get_registry
 
 class AdvancedPerception:
-    def __init__(self, hotarc):
+    def __init__(self, hotarc, lazy=False):
         self.hotarc = hotarc
-        self.text_analyzer = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment")
-        self.code_analyzer = pipeline("code-to-text", model="Salesforce/codet5-base")
-        self.speech_recognizer = whisper.load_model("base")
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        registry = get_registry()
+        self.text_analyzer = LazyModel(lambda: registry.acquire("sentiment-analysis", "nlptown/bert-base-multilingual-uncased-sentiment"), name="text_analyzer")
+        self.code_analyzer = LazyModel(lambda: registry.acquire("code-to-text", "Salesforce/codet5-base"), name="code_analyzer")
+        self.speech_recognizer = LazyModel(lambda: registry.acquire("speech-recognition", "whisper-base", loader=lambda: whisper.load_model("base")), name="speech_recognizer")
+        self.face_cascade = LazyModel(lambda: cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'), name="face_cascade")
+        if not lazy:
+            for model in (self.text_analyzer, self.code_analyzer, self.speech_recognizer, self.face_cascade):
+                model.get()
         logging.basicConfig(filename='advanced_perception.log', level=logging.INFO)
 
     def execute(self):
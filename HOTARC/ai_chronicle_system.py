@@ -1,29 +1,228 @@
 import json
 import os
 import time
+import zlib
+import struct
 import logging
+from array import array
 from hashlib import md5
 
+class ChronicleJournal:
+    """
+    Append-only JSONL journal. Each line is {"crc": "<crc32 of record>", "record": <record>} and
+    a sidecar .idx file holds the byte offset of every record, so appends are O(1) and startup
+    reads the index instead of parsing the journal. On recovery, records after the last indexed
+    one are re-verified and a torn or corrupt tail is truncated.
+    """
+    HEADER = '{"crc":"%08x","record":'
+    HEADER_SIZE = len(HEADER % 0)
+    FOOTER = b'}\n'
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.fsync = fsync
+        self.offsets = array('q')
+        self.end = 0
+        self.file = None
+        self.index_file = None
+        self.recover()
+
+    def recover(self):
+        start = time.perf_counter()
+        self.close()
+        if not os.path.exists(self.path):
+            open(self.path, 'wb').close()
+        size = os.path.getsize(self.path)
+        offsets = array('q')
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as file:
+                data = file.read()
+            offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+        indexed = len(offsets)
+        # Index entries beyond the journal come from a write that never reached the journal.
+        while offsets and offsets[-1] >= size:
+            offsets.pop()
+        position = offsets.pop() if offsets else 0
+        with open(self.path, 'rb') as file:
+            file.seek(position)
+            for line in file:
+                if self._decode(line) is None:
+                    break
+                offsets.append(position)
+                position += len(line)
+        if position < size:
+            logging.warning(f"Truncating {size - position} bytes of torn or corrupt journal tail in {self.path}")
+            with open(self.path, 'r+b') as file:
+                file.truncate(position)
+                os.fsync(file.fileno())
+        if len(offsets) != indexed:
+            self._write_index(offsets)
+        self.offsets = offsets
+        self.end = position
+        self.file = open(self.path, 'a+b')
+        self.index_file = open(self.index_path, 'ab')
+        logging.info(f"Recovered {len(offsets)} journal records from {self.path} in {time.perf_counter() - start:.3f}s")
+
+    def _write_index(self, offsets):
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            offsets.tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.index_path)
+
+    def _encode(self, record):
+        payload = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        return (self.HEADER % zlib.crc32(payload)).encode('ascii') + payload + self.FOOTER
+
+    def _decode(self, line):
+        # The payload sits between a fixed-size header and footer, so it is checked without re-serializing.
+        if len(line) < self.HEADER_SIZE + len(self.FOOTER) or not line.endswith(self.FOOTER):
+            return None
+        try:
+            crc = int(line[8:16], 16)
+        except ValueError:
+            return None
+        payload = line[self.HEADER_SIZE:-len(self.FOOTER)]
+        if line[:8] != b'{"crc":"' or zlib.crc32(payload) != crc:
+            return None
+        return json.loads(payload)
+
+    def append(self, record):
+        line = self._encode(record)
+        self.file.write(line)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        # The index is written after the record, so a crash can only leave it behind the journal.
+        self.index_file.write(struct.pack('q', self.end))
+        self.index_file.flush()
+        self.offsets.append(self.end)
+        self.end += len(line)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("journal index out of range")
+        start = self.offsets[item]
+        end = self.offsets[item + 1] if item + 1 < len(self) else self.end
+        record = self._decode(os.pread(self.file.fileno(), end - start, start))
+        if record is None:
+            raise ValueError(f"Checksum mismatch in journal record {item} of {self.path}")
+        return record
+
+    def __iter__(self):
+        with open(self.path, 'rb') as file:
+            for i, line in enumerate(file):
+                if i >= len(self):
+                    return
+                record = self._decode(line)
+                if record is None:
+                    raise ValueError(f"Checksum mismatch in journal record {i} of {self.path}")
+                yield record
+
+    def intact(self):
+        """
+        Yields every record that passes its checksum, logging and skipping corrupt ones, so
+        compaction can drop a bad record instead of failing on it.
+        """
+        for i in range(len(self)):
+            try:
+                yield self[i]
+            except ValueError as e:
+                logging.error(f"Dropping corrupt journal record: {e}")
+
+    def rewrite(self, records):
+        """
+        Compacts the journal to exactly the given records. The index is removed before the journal
+        is replaced, so a crash in between falls back to a full scan rather than a stale index.
+        """
+        temp_path = self.path + '.tmp'
+        offsets = array('q')
+        position = 0
+        with open(temp_path, 'wb') as file:
+            for record in records:
+                line = self._encode(record)
+                file.write(line)
+                offsets.append(position)
+                position += len(line)
+            file.flush()
+            os.fsync(file.fileno())
+        self.close()
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        os.replace(temp_path, self.path)
+        self._write_index(offsets)
+        self.offsets = offsets
+        self.end = position
+        self.file = open(self.path, 'a+b')
+        self.index_file = open(self.index_path, 'ab')
+
+    def close(self):
+        for file in (self.file, self.index_file):
+            if file is not None:
+                file.close()
+        self.file = None
+        self.index_file = None
+
 class AIChronicleSystem:
-    def __init__(self, file_path='chronicles.json', archive_path='archive/', max_entries=1000):
+    def __init__(self, file_path='chronicles.json', archive_path='archive/', max_entries=1000, backend='json',
+                 journal_path=None, fsync=True):
+        if backend not in ('json', 'journal'):
+            raise ValueError(f"Unknown chronicle backend: {backend}")
         self.file_path = file_path
         self.archive_path = archive_path
         self.max_entries = max_entries
+        self.backend = backend
+        self.journal_path = journal_path or os.path.splitext(file_path)[0] + '.jsonl'
+        self.fsync = fsync
+        self.journal = None
         self.chronicles = []
         logging.basicConfig(filename='ai_chronicle_system.log', level=logging.INFO)
         self.load_chronicles()
 
     def load_chronicles(self):
         try:
-            if os.path.exists(self.file_path):
+            if self.backend == 'journal':
+                self._load_journal()
+            elif os.path.exists(self.file_path):
                 with open(self.file_path, 'r') as file:
                     self.chronicles = json.load(file)
             logging.info("Chronicles loaded successfully.")
         except Exception as e:
             logging.error(f"Failed to load chronicles: {e}")
 
+    def _load_journal(self):
+        start = time.perf_counter()
+        self.journal = ChronicleJournal(self.journal_path, fsync=self.fsync)
+        migrated_path = self.file_path + '.migrated'
+        if len(self.journal) == 0 and os.path.exists(self.file_path) and not os.path.exists(migrated_path):
+            # One-time migration of an existing JSON chronicle file. The file is retired afterwards so
+            # emptying or archiving the journal later does not bring its entries back.
+            with open(self.file_path, 'r') as file:
+                self.journal.rewrite(json.load(file))
+            os.replace(self.file_path, migrated_path)
+            logging.info(f"Migrated {len(self.journal)} chronicles from {self.file_path} to {self.journal_path}")
+        self.chronicles = self.journal
+        logging.info(f"Opened chronicle journal with {len(self.journal)} entries in {time.perf_counter() - start:.3f}s")
+
     def document_evolution(self, entry):
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        if self.journal is not None:
+            try:
+                self.journal.append({"timestamp": timestamp, "entry": entry})
+            except Exception as e:
+                logging.error(f"Failed to append chronicle to {self.journal_path}: {e}")
+            if len(self.journal) > self.max_entries:
+                self.archive_old_chronicles()
+            return
         self.chronicles.append({"timestamp": timestamp, "entry": entry})
         if len(self.chronicles) > self.max_entries:
             self.archive_old_chronicles()
@@ -34,14 +233,31 @@ class AIChronicleSystem:
             if not os.path.exists(self.archive_path):
                 os.makedirs(self.archive_path)
             archive_file = os.path.join(self.archive_path, f"chronicles_{int(time.time())}.json")
+            chronicles = list(self.journal.intact()) if self.journal is not None else list(self.chronicles)
             with open(archive_file, 'w') as file:
-                json.dump(self.chronicles[:self.max_entries // 2], file)
-            self.chronicles = self.chronicles[self.max_entries // 2:]
+                json.dump(chronicles[:self.max_entries // 2], file)
+            if self.journal is not None:
+                # Archiving doubles as periodic compaction of the journal.
+                self.journal.rewrite(chronicles[self.max_entries // 2:])
+            else:
+                self.chronicles = chronicles[self.max_entries // 2:]
             logging.info(f"Archived old chronicles to {archive_file}")
         except Exception as e:
             logging.error(f"Failed to archive chronicles: {e}")
 
+    def compact(self):
+        """
+        Rewrites the journal with its current entries, dropping any space left by recovery and
+        any record that fails its checksum.
+        """
+        if self.journal is not None:
+            self.journal.rewrite(list(self.journal.intact()))
+            logging.info(f"Compacted chronicle journal {self.journal_path}")
+
     def save_chronicles(self):
+        if self.journal is not None:
+            # Journal records are durable as soon as they are appended.
+            return
         try:
             temp_file_path = self.file_path + '.tmp'
             with open(temp_file_path, 'w') as file:
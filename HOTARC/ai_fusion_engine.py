@@ -3,6 +3,7 @@ import torch
 import numpy as np
 import concurrent.futures
 import logging
+from model_registry import get_registry
 
 class AIFusionEngine:
     def __init__(self):
@@ -11,14 +12,17 @@ class AIFusionEngine:
 
     def add_model(self, model_name):
         try:
-            tokenizer = AutoTokenizer.from_pretrained(model_name)
-            model = AutoModel.from_pretrained(model_name)
-            model = torch.nn.DataParallel(model)
+            tokenizer, model = get_registry().acquire('auto-model', model_name, loader=lambda: self._load_model(model_name))
             self.models.append((tokenizer, model))
             logging.info(f"Model {model_name} added successfully.")
         except Exception as e:
             logging.error(f"Error loading model {model_name}: {e}")
 
+    def _load_model(self, model_name):
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        return tokenizer, torch.nn.DataParallel(model)
+
     def integrate_knowledge(self, text, context):
         integrated_knowledge = ""
         with concurrent.futures.ThreadPoolExecutor() as executor:
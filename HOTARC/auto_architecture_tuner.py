@@ -2,18 +2,23 @@ import time
 import threading
 import logging
 import torch
-from transformers import pipeline
+from model_registry import get_registry
 
 class AutoArchitectureTuner:
     def __init__(self, hotarc):
         self.hotarc = hotarc
         self.tuning = False
         self.lock = threading.Lock()
+        self.registry = get_registry()
         logging.basicConfig(filename='auto_architecture_tuner.log', level=logging.INFO)
 
     def benchmark_model(self, model):
         try:
-            classifier = pipeline('sentiment-analysis', model=model)
+            classifier = self.registry.acquire('sentiment-analysis', model)
+        except Exception as e:
+            logging.error(f"Error loading model {model} in benchmark_model: {e}")
+            return float('inf'), float('inf'), float('inf')
+        try:
             results = classifier("I love using transformers!")
             training_loss = torch.tensor([result['score'] for result in results]).mean().item()
             inference_start = time.time()
@@ -24,6 +29,8 @@ class AutoArchitectureTuner:
         except Exception as e:
             logging.error(f"Error in benchmark_model: {e}")
             return float('inf'), float('inf'), float('inf')
+        finally:
+            self.registry.release('sentiment-analysis', model)
 
     def _simulate_energy_efficiency(self, model):
         # Placeholder for a real energy efficiency metric
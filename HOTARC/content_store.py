@@ -0,0 +1,413 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import shutil
+import tempfile
+import threading
+import contextlib
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux ioctl that clones a file's extents into another file (reflink) on btrfs, XFS and similar.
+FICLONE = 0x40049409
+
+def _read_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+# New files are created with the same permissions open() would give them.
+UMASK = _read_umask()
+
+def fsync_directory(directory):
+    # Makes renames into the directory durable; not supported on every platform.
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class ContentStore:
+    """
+    Content-addressed blob store with a path index. Blobs are stored once per content hash
+    under a sharded directory tree (objects/ab/cd/<hash>) and reference counted; logical
+    paths map to hashes in a small SQLite index. Every path, saved or copied, is materialized
+    as a private, writable file (a reflink where the filesystem supports it, otherwise a copy),
+    so writing one path never affects the blob or another path. Each path's (inode, size,
+    mtime_ns) is recorded, so unchanged content is recognised from one stat: saving it writes
+    nothing, copies are one reference bump plus a reflink or copy, and gc() removes blobs that
+    are no longer referenced.
+
+    Writes to different paths run concurrently: only index updates take the store lock.
+    With sync=False the directory fsyncs are deferred until sync_directories() is called.
+    """
+    CHUNK_SIZE = 1 << 20
+    HASH_ALGORITHM = 'sha256'
+    PATH_LOCKS = 64
+
+    def __init__(self, root='hotarc_cas'):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.temp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER,
+                refcount INTEGER
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS paths (
+                path TEXT PRIMARY KEY,
+                digest TEXT,
+                inode INTEGER,
+                size INTEGER,
+                mtime_ns INTEGER
+            )
+        ''')
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(paths)')}
+        for column in ('inode', 'size', 'mtime_ns'):
+            if column not in columns:
+                self.conn.execute(f'ALTER TABLE paths ADD COLUMN {column} INTEGER')
+        self.conn.commit()
+        # self.lock guards the index connection, the stats and the pending directories. Writes to
+        # the same path are ordered by one of PATH_LOCKS striped locks, and gc() waits for
+        # in-flight writes so it never removes a blob that is about to be referenced.
+        self.lock = threading.RLock()
+        self.idle = threading.Condition(self.lock)
+        self.active_writes = 0
+        self.path_locks = [threading.Lock() for _ in range(self.PATH_LOCKS)]
+        self.pending_directories = set()
+        self.stats = {"writes": 0, "skipped": 0, "deduplicated": 0, "reflinks": 0, "copies": 0}
+        logging.basicConfig(filename='content_store.log', level=logging.INFO)
+
+    def blob_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:4], digest)
+
+    def _key(self, path):
+        return os.path.abspath(path)
+
+    def _path_lock(self, path):
+        return self.path_locks[hash(self._key(path)) % len(self.path_locks)]
+
+    @contextlib.contextmanager
+    def _writing(self):
+        with self.lock:
+            self.active_writes += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active_writes -= 1
+                self.idle.notify_all()
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def _synced(self, directories, sync):
+        if sync:
+            for directory in directories:
+                fsync_directory(directory)
+        else:
+            with self.lock:
+                self.pending_directories.update(directories)
+
+    def sync_directories(self):
+        """
+        Fsyncs every directory touched by writes made with sync=False, once each. Returns the count.
+        """
+        with self.lock:
+            directories = sorted(self.pending_directories)
+            self.pending_directories.clear()
+        for directory in directories:
+            fsync_directory(directory)
+        return len(directories)
+
+    def put(self, chunks, sync=True):
+        """
+        Stores an iterable of byte chunks (or a binary file object) as a blob without adding a
+        reference. The data is hashed while it is written to a temporary file; if the blob already
+        exists the temporary file is discarded. Returns (digest, size).
+        """
+        if isinstance(chunks, (bytes, bytearray, memoryview)):
+            return self.put_bytes(chunks, sync)
+        if hasattr(chunks, 'read'):
+            source = chunks
+            chunks = iter(lambda: source.read(self.CHUNK_SIZE), b'')
+        hasher = hashlib.new(self.HASH_ALGORITHM)
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+                file.flush()
+                os.fsync(file.fileno())
+            digest = hasher.hexdigest()
+            self._commit_blob(digest, temp_path, sync)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return digest, size
+
+    def put_bytes(self, data, sync=True):
+        """
+        Stores in-memory content. The hash is computed first, so known content is never written.
+        """
+        digest = hashlib.new(self.HASH_ALGORITHM, data).hexdigest()
+        if os.path.exists(self.blob_path(digest)):
+            self._count("deduplicated")
+            return digest, len(data)
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            self._commit_blob(digest, temp_path, sync)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return digest, len(data)
+
+    def _commit_blob(self, digest, temp_path, sync=True):
+        blob_path = self.blob_path(digest)
+        if os.path.exists(blob_path):
+            self._count("deduplicated")
+            return
+        directory = os.path.dirname(blob_path)
+        # A new shard directory is itself an entry in its parent, which must be synced too.
+        directories = [directory] if os.path.isdir(directory) else [directory, os.path.dirname(directory), self.objects_dir]
+        os.makedirs(directory, exist_ok=True)
+        # Blobs are immutable and never handed out directly; read-only guards against stray writes.
+        os.chmod(temp_path, 0o444)
+        os.replace(temp_path, blob_path)
+        self._count("writes")
+        self._synced(directories, sync)
+
+    def save(self, path, content, sync=True):
+        """
+        Points path at the given content (bytes, str, iterable of byte chunks or binary file object)
+        and materializes it as a private reflink or copy. Returns (digest, changed); unchanged content is skipped.
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        with self._writing(), self._path_lock(path):
+            current = self.digest_of(path)
+            unchanged = current is not None and self._matches(path, current)
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                digest = hashlib.new(self.HASH_ALGORITHM, content).hexdigest()
+                if unchanged and self.digest_of(path) == digest:
+                    self._count("skipped")
+                    return digest, False
+            digest, size = self.put(content, sync)
+            changed = self._point(path, digest, size, sync)
+            return digest, changed
+
+    def import_file(self, path, sync=True):
+        """
+        Adds an existing file to the store and indexes it under its own path, leaving the file itself
+        untouched. Files that are already indexed and unmodified are not read again. Returns the digest.
+        """
+        with self._writing(), self._path_lock(path):
+            digest = self.digest_of(path)
+            if digest is not None and self._matches(path, digest):
+                return digest
+            with open(path, 'rb') as file:
+                before = os.fstat(file.fileno())
+                digest, size = self.put(file, sync)
+            self._reference(path, digest, size)
+            # Only trust the signature if the file did not change while it was being read.
+            if self._signature(os.stat(path)) == self._signature(before):
+                self._record(path, before)
+            return digest
+
+    def _reference(self, path, digest, size):
+        with self.lock:
+            previous = self.digest_of(path)
+            if previous != digest:
+                with self.conn:
+                    self.conn.execute('''
+                        INSERT INTO blobs (digest, size, refcount) VALUES (?, ?, 1)
+                        ON CONFLICT(digest) DO UPDATE SET refcount = refcount + 1
+                    ''', (digest, size))
+                    if previous is not None:
+                        self.conn.execute('UPDATE blobs SET refcount = refcount - 1 WHERE digest = ?', (previous,))
+                    self.conn.execute('INSERT OR REPLACE INTO paths (path, digest) VALUES (?, ?)', (self._key(path), digest))
+            return previous
+
+    def _point(self, path, digest, size, sync=True):
+        previous = self._reference(path, digest, size)
+        if previous == digest and self._matches(path, digest):
+            self._count("skipped")
+            return False
+        self._materialize(path, digest, sync)
+        return True
+
+    def _blob_size(self, digest):
+        with self.lock:
+            row = self.conn.execute('SELECT size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def _signature(self, stat):
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _record(self, path, stat=None):
+        stat = stat or os.stat(path)
+        with self.lock, self.conn:
+            self.conn.execute('UPDATE paths SET inode = ?, size = ?, mtime_ns = ? WHERE path = ?',
+                              self._signature(stat) + (self._key(path),))
+
+    def _matches(self, path, digest):
+        """
+        True if the file at path is still the one recorded for digest: same inode, size and mtime_ns.
+        Any atomic replacement gives the path a new inode, so no content needs to be re-read.
+        """
+        with self.lock:
+            row = self.conn.execute('SELECT inode, size, mtime_ns FROM paths WHERE path = ? AND digest = ?',
+                                    (self._key(path), digest)).fetchone()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return row is not None and tuple(row) == self._signature(stat)
+
+    def _materialize(self, path, digest, sync=True):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+        os.close(fd)
+        try:
+            # Paths get their own inode, so writing one never changes the blob or another path. Keep
+            # the replaced file's mode, unless it is a read-only blob hardlink left by an older version.
+            try:
+                stat = os.stat(path)
+                mode = stat.st_mode & 0o7777
+                if mode == 0o444 and stat.st_nlink > 1:
+                    mode = 0o666 & ~UMASK
+            except OSError:
+                mode = 0o666 & ~UMASK
+            with open(self.blob_path(digest), 'rb') as src, open(temp_path, 'wb') as dest:
+                self._clone(src, dest)
+                dest.flush()
+                os.fsync(dest.fileno())
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._record(path)
+        self._synced([directory], sync)
+
+    def _clone(self, src, dest):
+        """
+        Copies a blob into an open file: a reflink (shared extents, copy-on-write) where the
+        filesystem supports it, otherwise copy_file_range, otherwise a chunked copy.
+        """
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+                self._count("reflinks")
+                return
+            except OSError:
+                pass
+        self._count("copies")
+        size = os.fstat(src.fileno()).st_size
+        copied = 0
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while copied < size:
+                    sent = os.copy_file_range(src.fileno(), dest.fileno(), min(size - copied, 1 << 30), copied, copied)
+                    if sent == 0:
+                        break
+                    copied += sent
+            except OSError:
+                pass
+        src.seek(copied)
+        dest.seek(copied)
+        shutil.copyfileobj(src, dest, self.CHUNK_SIZE)
+
+    def digest_of(self, path):
+        with self.lock:
+            row = self.conn.execute('SELECT digest FROM paths WHERE path = ?', (self._key(path),)).fetchone()
+        return row[0] if row else None
+
+    def copy(self, src_path, dest_path, sync=True):
+        """
+        Points dest_path at src_path's blob: one reference bump and a private reflink or copy of the blob.
+        A source that is not indexed yet (or was replaced since) is imported first, without touching it.
+        """
+        with self._writing():
+            digest = self.import_file(src_path, sync)
+            with self._path_lock(dest_path):
+                self._point(dest_path, digest, self._blob_size(digest), sync)
+            return digest
+
+    def read(self, path):
+        digest = self.digest_of(path)
+        if digest is None:
+            raise FileNotFoundError(f"{path} is not in the content store")
+        with open(self.blob_path(digest), 'rb') as file:
+            return file.read()
+
+    def delete(self, path):
+        """
+        Removes path and drops its reference; the blob stays until gc() runs.
+        """
+        with self._path_lock(path):
+            with self.lock:
+                digest = self.digest_of(path)
+                if digest is not None:
+                    with self.conn:
+                        self.conn.execute('DELETE FROM paths WHERE path = ?', (self._key(path),))
+                        self.conn.execute('UPDATE blobs SET refcount = refcount - 1 WHERE digest = ?', (digest,))
+            if os.path.lexists(path):
+                os.remove(path)
+            return digest is not None
+
+    def gc(self):
+        """
+        Deletes blobs with no remaining references. Returns the number of blobs and bytes freed.
+        """
+        start = time.perf_counter()
+        with self.lock:
+            # A write may have stored a blob it has not referenced yet; let it finish first.
+            self.idle.wait_for(lambda: self.active_writes == 0)
+            rows = self.conn.execute('SELECT digest, size FROM blobs WHERE refcount <= 0').fetchall()
+            for digest, _ in rows:
+                blob_path = self.blob_path(digest)
+                if os.path.exists(blob_path):
+                    os.remove(blob_path)
+            with self.conn:
+                self.conn.executemany('DELETE FROM blobs WHERE digest = ? AND refcount <= 0', [(digest,) for digest, _ in rows])
+        freed = sum(size for _, size in rows)
+        logging.info(f"Garbage collected {len(rows)} blobs ({freed} bytes) in {time.perf_counter() - start:.3f}s.")
+        return {"blobs": len(rows), "bytes": freed}
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["blobs"], stats["stored_bytes"] = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+            stats["paths"] = self.conn.execute('SELECT COUNT(*) FROM paths').fetchone()[0]
+        return stats
+
+    def close(self):
+        self.sync_directories()
+        self.conn.close()
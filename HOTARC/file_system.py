@@ -1,23 +1,98 @@
 import os
+import time
 import shutil
+import asyncio
+import concurrent.futures
 import hashlib
 import logging
+import tempfile
+import threading
+from content_store import ContentStore, UMASK, fsync_directory
 
 class FileSystem:
-    def __init__(self):
+    """
+    File storage with integrity checks. Writes stream chunks into a temporary file that is hashed
+    as it is written, fsynced and renamed into place (save_stream); copies use copy_file_range or
+    sendfile with one streaming checksum, so large files take constant memory. storage='cas' backs
+    files with a ContentStore, and collect_garbage() removes unreferenced blobs. save_many,
+    read_many and copy_many (and asave_many/aread_many/acopy_many) run on a bounded thread pool,
+    fsync each touched directory once per batch and record throughput in last_batch_report.
+    """
+    CHUNK_SIZE = 1 << 20
+    HASH_ALGORITHM = 'sha256'
+
+    def __init__(self, storage='plain', cas_root='hotarc_cas', max_workers=None):
+        if storage not in ('plain', 'cas'):
+            raise ValueError(f"Unknown storage mode: {storage}")
+        self.storage = storage
+        # In 'cas' mode files are backed by deduplicated, reference-counted blobs.
+        self.content_store = ContentStore(cas_root) if storage == 'cas' else None
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.executor = None
+        self.executor_lock = threading.Lock()
+        # Batches (e.g. from asave_many) finish on worker threads; the report is swapped under its own lock.
+        self.report_lock = threading.Lock()
+        self._last_batch_report = None
         logging.basicConfig(filename='file_system.log', level=logging.INFO)
 
     def save_file(self, file_path, content):
         try:
-            with open(file_path, 'w') as file:
-                file.write(content)
-            if self._verify_file_integrity(file_path, content):
-                logging.info(f"File saved successfully: {file_path}")
-            else:
-                logging.error(f"File integrity check failed after saving: {file_path}")
+            data = content.encode('utf-8') if isinstance(content, str) else content
+            if self.content_store is not None:
+                digest, changed = self.content_store.save(file_path, data)
+                logging.info(f"File {'saved' if changed else 'unchanged'}: {file_path} ({self.HASH_ALGORITHM} {digest})")
+                return digest
+            digest = self.save_stream(file_path, [data])
+            logging.info(f"File saved successfully: {file_path} ({self.HASH_ALGORITHM} {digest})")
+            return digest
         except Exception as e:
             logging.error(f"Error saving file {file_path}: {e}")
 
+    def save_stream(self, file_path, chunks, sync_dir=True):
+        """
+        Atomically writes an iterable of byte chunks (or a binary file object) to file_path in
+        constant memory. The data goes to a temporary file in the same directory, hashed as it
+        is written, and is renamed over file_path once flushed to disk. Returns the hex digest.
+        """
+        if hasattr(chunks, 'read'):
+            source = chunks
+            chunks = iter(lambda: source.read(self.CHUNK_SIZE), b'')
+        hasher = hashlib.new(self.HASH_ALGORITHM)
+
+        def write(file):
+            for chunk in chunks:
+                hasher.update(chunk)
+                file.write(chunk)
+
+        self._write_atomic(file_path, write, sync_dir=sync_dir)
+        return hasher.hexdigest()
+
+    def _write_atomic(self, file_path, write, mode=None, sync_dir=True):
+        directory = os.path.dirname(os.path.abspath(file_path))
+        if mode is None:
+            # mkstemp creates 0600 files; keep the replaced file's mode, or open()'s default for new files.
+            try:
+                mode = os.stat(file_path).st_mode & 0o7777
+            except OSError:
+                mode = 0o666 & ~UMASK
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(file_path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                write(file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        if sync_dir:
+            self._fsync_directory(directory)
+
+    def _fsync_directory(self, directory):
+        fsync_directory(directory)
+
     def read_file(self, file_path):
         try:
             with open(file_path, 'r') as file:
@@ -28,31 +103,228 @@ class FileSystem:
             logging.error(f"Error reading file {file_path}: {e}")
             return None
 
+    def read_stream(self, file_path, chunk_size=None):
+        """
+        Yields the file's contents as byte chunks.
+        """
+        with open(file_path, 'rb') as file:
+            yield from iter(lambda: file.read(chunk_size or self.CHUNK_SIZE), b'')
+
+    def file_digest(self, file_path):
+        """
+        Streams the file through the hash in CHUNK_SIZE pieces and returns the hex digest.
+        """
+        hasher = hashlib.new(self.HASH_ALGORITHM)
+        for chunk in self.read_stream(file_path):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
     def delete_file(self, file_path):
         try:
+            if self.content_store is not None and self.content_store.delete(file_path):
+                logging.info(f"File deleted successfully: {file_path}")
+                return
             os.remove(file_path)
             logging.info(f"File deleted successfully: {file_path}")
         except Exception as e:
             logging.error(f"Error deleting file {file_path}: {e}")
 
-    def copy_file(self, src_path, dest_path):
+    def copy_file(self, src_path, dest_path, expected_digest=None):
+        """
+        Copies src_path to dest_path atomically with a kernel-side copy, then checksums the copy
+        once. If expected_digest is given (e.g. returned by save_file), the copy must match it.
+        """
         try:
-            shutil.copy(src_path, dest_path)
-            if self._verify_file_integrity(dest_path, self.read_file(src_path)):
-                logging.info(f"File copied successfully from {src_path} to {dest_path}")
+            if self.content_store is not None:
+                digest = self.content_store.copy(src_path, dest_path)
             else:
-                logging.error(f"File integrity check failed after copying from {src_path} to {dest_path}")
+                digest = self._copy_stream(src_path, dest_path)
+            if expected_digest is None or digest == expected_digest:
+                logging.info(f"File copied successfully from {src_path} to {dest_path}")
+                return digest
+            logging.error(f"File integrity check failed after copying from {src_path} to {dest_path}")
         except Exception as e:
             logging.error(f"Error copying file from {src_path} to {dest_path}: {e}")
 
-    def _verify_file_integrity(self, file_path, original_content):
-        try:
-            with open(file_path, 'r') as file:
+    def _copy_stream(self, src_path, dest_path, sync_dir=True):
+        with open(src_path, 'rb') as src:
+            size = os.fstat(src.fileno()).st_size
+            mode = os.fstat(src.fileno()).st_mode & 0o7777
+            hasher = hashlib.new(self.HASH_ALGORITHM)
+
+            def write(dest):
+                copied = self._kernel_copy(src, dest, size)
+                dest.flush()
+                # Single streaming checksum pass over the copy, which also confirms its length.
+                dest_size = 0
+                for chunk in iter(lambda: os.pread(dest.fileno(), self.CHUNK_SIZE, dest_size), b''):
+                    hasher.update(chunk)
+                    dest_size += len(chunk)
+                if copied != size or dest_size != size:
+                    raise IOError(f"Copied {dest_size} of {size} bytes")
+
+            self._write_atomic(dest_path, write, mode=mode, sync_dir=sync_dir)
+        return hasher.hexdigest()
+
+    def _kernel_copy(self, src, dest, size):
+        """
+        Copies size bytes between open files without passing the data through user space where possible:
+        copy_file_range, then sendfile, then a chunked user-space copy.
+        """
+        src_fd, dest_fd = src.fileno(), dest.fileno()
+        copied = 0
+        for method in ('copy_file_range', 'sendfile'):
+            if not hasattr(os, method):
+                continue
+            try:
+                while copied < size:
+                    if method == 'copy_file_range':
+                        sent = os.copy_file_range(src_fd, dest_fd, min(size - copied, 1 << 30), copied, copied)
+                    else:
+                        os.lseek(dest_fd, copied, os.SEEK_SET)
+                        sent = os.sendfile(dest_fd, src_fd, copied, min(size - copied, 1 << 30))
+                    if sent == 0:
+                        break
+                    copied += sent
+                return copied
+            except OSError:
+                # Unsupported by this filesystem or kernel; fall through to the next method.
+                continue
+        src.seek(copied)
+        dest.seek(copied)
+        shutil.copyfileobj(src, dest, self.CHUNK_SIZE)
+        return size
+
+    def _get_executor(self):
+        if self.executor is None:
+            with self.executor_lock:
+                if self.executor is None:
+                    self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def _run_batch(self, operation, func, items, directories):
+        """
+        Runs func(item) for every item on the bounded pool, then fsyncs each touched directory once.
+        Returns per-item results (None on failure) and records a throughput report.
+        """
+        start = time.perf_counter()
+        futures = [self._get_executor().submit(func, item) for item in items]
+        results = []
+        errors = 0
+        total_bytes = 0
+        for item, future in zip(items, futures):
+            try:
+                result, size = future.result()
+                total_bytes += size
+            except Exception as e:
+                logging.error(f"Error in {operation} for {item[0] if isinstance(item, tuple) else item}: {e}")
+                result = None
+                errors += 1
+            results.append(result)
+        for directory in directories:
+            self._fsync_directory(directory)
+        if self.content_store is not None and operation != 'read_many':
+            # Blob shards and destination directories touched by deferred-sync CAS writes.
+            self.content_store.sync_directories()
+        elapsed = time.perf_counter() - start
+        report = {"operation": operation, "files": len(items), "errors": errors, "bytes": total_bytes,
+                  "seconds": elapsed, "files_per_second": len(items) / elapsed if elapsed else 0.0,
+                  "mb_per_second": total_bytes / elapsed / 1e6 if elapsed else 0.0}
+        with self.report_lock:
+            self._last_batch_report = report
+        logging.info(f"{operation}: {len(items)} files, {total_bytes} bytes, {errors} errors in {elapsed:.3f}s "
+                     f"({report['files_per_second']:.0f} files/s, {report['mb_per_second']:.1f} MB/s)")
+        return results
+
+    @property
+    def last_batch_report(self):
+        """
+        Throughput report of the most recently finished batch, as a copy taken under report_lock.
+        """
+        with self.report_lock:
+            return dict(self._last_batch_report) if self._last_batch_report is not None else None
+
+    def _parent_directories(self, paths):
+        return sorted({os.path.dirname(os.path.abspath(path)) for path in paths})
+
+    def save_many(self, items):
+        """
+        Saves many files concurrently. Accepts a dict or an iterable of (path, content) pairs and
+        returns a dict mapping each path to its digest (None if it failed). Each directory is
+        fsynced once for the whole batch instead of once per file.
+        """
+        if isinstance(items, dict):
+            items = items.items()
+        items = [(path, content.encode('utf-8') if isinstance(content, str) else content) for path, content in items]
+
+        def save(item):
+            path, data = item
+            if self.content_store is not None:
+                return self.content_store.save(path, data, sync=False)[0], len(data)
+            return self.save_stream(path, [data], sync_dir=False), len(data)
+
+        directories = [] if self.content_store is not None else self._parent_directories(path for path, _ in items)
+        results = self._run_batch('save_many', save, items, directories)
+        return {path: digest for (path, _), digest in zip(items, results)}
+
+    def read_many(self, paths, binary=False):
+        """
+        Reads many files concurrently. Returns a dict mapping each path to its content (None if it failed).
+        """
+        paths = list(paths)
+
+        def read(path):
+            with open(path, 'rb' if binary else 'r') as file:
                 content = file.read()
-            if hashlib.md5(content.encode('utf-8')).hexdigest() == hashlib.md5(original_content.encode('utf-8')).hexdigest():
-                return True
-            else:
-                return False
-        except Exception as e:
-            logging.error(f"Error verifying file integrity for {file_path}: {e}")
-            return False
\ No newline at end of file
+            return content, len(content)
+
+        results = self._run_batch('read_many', read, paths, [])
+        return dict(zip(paths, results))
+
+    def copy_many(self, pairs):
+        """
+        Copies many files concurrently. Accepts a dict or an iterable of (src, dest) pairs and returns
+        a dict mapping each destination to its digest (None if it failed).
+        """
+        if isinstance(pairs, dict):
+            pairs = pairs.items()
+        pairs = list(pairs)
+
+        def copy(pair):
+            src_path, dest_path = pair
+            if self.content_store is not None:
+                return self.content_store.copy(src_path, dest_path, sync=False), os.path.getsize(dest_path)
+            return self._copy_stream(src_path, dest_path, sync_dir=False), os.path.getsize(dest_path)
+
+        directories = [] if self.content_store is not None else self._parent_directories(dest for _, dest in pairs)
+        results = self._run_batch('copy_many', copy, pairs, directories)
+        return {dest: digest for (_, dest), digest in zip(pairs, results)}
+
+    async def _run_async(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def asave_many(self, items):
+        return await self._run_async(self.save_many, items)
+
+    async def aread_many(self, paths, binary=False):
+        return await self._run_async(self.read_many, paths, binary)
+
+    async def acopy_many(self, pairs):
+        return await self._run_async(self.copy_many, pairs)
+
+    def close(self):
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+        if self.content_store is not None:
+            self.content_store.close()
+
+    def collect_garbage(self):
+        """
+        Removes content-store blobs that no file refers to any more.
+        """
+        if self.content_store is None:
+            return {"blobs": 0, "bytes": 0}
+        return self.content_store.gc()
+
@@ -1,11 +1,14 @@
 import logging
 import numpy as np
-from transformers import pipeline
+from model_loader import LazyModel
+from model_registry import get_registry
 
 class FullAutonomy:
-    def __init__(self, hotarc):
+    def __init__(self, hotarc, lazy=False):
         self.hotarc = hotarc
-        self.risk_assessment_model = pipeline('text-classification', model='distilbert-base-uncased-finetuned-sst-2-english')
+        self.risk_assessment_model = LazyModel(lambda: get_registry().acquire('text-classification', 'distilbert-base-uncased-finetuned-sst-2-english'), name="risk_assessment_model")
+        if not lazy:
+            self.risk_assessment_model.get()
         logging.basicConfig(filename='full_autonomy.log', level=logging.INFO)
 
     def execute(self):
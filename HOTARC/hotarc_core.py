@@ -17,29 +17,37 @@ from full_autonomy import FullAutonomy
 from advanced_perception import AdvancedPerception
 from ethical_intelligence_module import EthicalIntelligenceModule
 from system_control import SystemControl
+from model_loader import StartupProfiler
+from stage_scheduler import StageScheduler
 
 class HOTARC:
-    def __init__(self):
-        self.memory_system = MemorySystem()
-        self.data_processor = DataProcessor()
-        self.reasoning_core = ReasoningCore()
-        self.auto_architecture_tuner = AutoArchitectureTuner(self)
-        self.ai_fusion_engine = AIFusionEngine()
-        self.quantum_ai_adaptability = QuantumAIAdaptability()
-        self.meta_learning_algorithm = MetaLearningAlgorithm()
-        self.ethical_intelligence = EthicalIntelligence()
-        self.file_system = FileSystem()
-        self.ai_chronicle_system = AIChronicleSystem()
-        self.recursive_self_improvement = RecursiveSelfImprovement()
-        self.self_enhancing_upgrades = SelfEnhancingUpgrades()
-        self.multi_agent_ai_fusion = MultiAgentAIFusion()
-        self.memory_management = MemoryManagement()
-        self.full_autonomy = FullAutonomy(self)
-        self.advanced_perception = AdvancedPerception(self)
-        self.ethical_intelligence_module = EthicalIntelligenceModule()
-        self.system_control = SystemControl(self)
+    def __init__(self, lazy=False):
+        self.lazy = lazy
+        self.startup_profiler = StartupProfiler()
+        build = self.startup_profiler.build
+        self.memory_system = build('memory_system', MemorySystem)
+        self.data_processor = build('data_processor', DataProcessor)
+        self.reasoning_core = build('reasoning_core', ReasoningCore)
+        self.auto_architecture_tuner = build('auto_architecture_tuner', lambda: AutoArchitectureTuner(self))
+        self.ai_fusion_engine = build('ai_fusion_engine', AIFusionEngine)
+        self.quantum_ai_adaptability = build('quantum_ai_adaptability', QuantumAIAdaptability)
+        self.meta_learning_algorithm = build('meta_learning_algorithm', MetaLearningAlgorithm)
+        self.ethical_intelligence = build('ethical_intelligence', EthicalIntelligence)
+        self.file_system = build('file_system', FileSystem)
+        self.ai_chronicle_system = build('ai_chronicle_system', AIChronicleSystem)
+        self.recursive_self_improvement = build('recursive_self_improvement', lambda: RecursiveSelfImprovement(lazy=lazy))
+        self.self_enhancing_upgrades = build('self_enhancing_upgrades', SelfEnhancingUpgrades)
+        self.multi_agent_ai_fusion = build('multi_agent_ai_fusion', MultiAgentAIFusion)
+        self.memory_management = build('memory_management', MemoryManagement)
+        self.full_autonomy = build('full_autonomy', lambda: FullAutonomy(self, lazy=lazy))
+        self.advanced_perception = build('advanced_perception', lambda: AdvancedPerception(self, lazy=lazy))
+        self.ethical_intelligence_module = build('ethical_intelligence_module', EthicalIntelligenceModule)
+        self.system_control = build('system_control', lambda: SystemControl(self))
         logging.basicConfig(filename='hotarc_core.log', level=logging.INFO)
 
+    def startup_report(self):
+        return self.startup_profiler.log_report()
+
     def check_dependencies(self):
         required_modules = [
             self.memory_system, self.data_processor, self.reasoning_core,
@@ -56,33 +64,41 @@ class HOTARC:
                 return False
         return True
 
-    def run(self):
+    def run(self, max_workers=None, stage_timeout=None):
         if not self.check_dependencies():
             logging.error("Failed to start HOTARC: Dependencies not met.")
             return
 
-        try:
-            self.memory_system.initialize()
-            self.data_processor.process_data()
-            self.reasoning_core.plan()
-            self.auto_architecture_tuner.continuous_tuning()
-            self.ai_fusion_engine.integrate_knowledge("Sample text for integration")
-            self.quantum_ai_adaptability.adapt()
-            self.meta_learning_algorithm.optimize_learning()
-            self.ethical_intelligence.apply_ethics({"situation": "Example"})
-            self.file_system.save_file("test.txt", "This is a test.")
-            self.ai_chronicle_system.document_evolution("Initial run complete.")
-            self.recursive_self_improvement.analyze_and_improve()
-            self.self_enhancing_upgrades.modify_architecture()
-            self.multi_agent_ai_fusion.fuse_models()
-            self.memory_management.optimize_memory()
-            self.full_autonomy.execute()
-            self.advanced_perception.execute()
-            self.ethical_intelligence_module.make_ethics_decision({"situation": "Example"})
-            self.system_control.execute()
+        scheduler = StageScheduler(max_workers=max_workers, default_timeout=stage_timeout)
+        # The stages do not pass data to each other, so none of them declares a dependency.
+        scheduler.add_method_stage('memory_init', self.memory_system, 'initialize')
+        scheduler.add_method_stage('data_processing', self.data_processor, 'process_data')
+        scheduler.add_method_stage('planning', self.reasoning_core, 'plan')
+        scheduler.add_method_stage('architecture_tuning', self.auto_architecture_tuner, 'continuous_tuning')
+        scheduler.add_method_stage('knowledge_fusion', self.ai_fusion_engine, 'integrate_knowledge',
+                                   args=("Sample text for integration",))
+        scheduler.add_method_stage('quantum_adaptation', self.quantum_ai_adaptability, 'adapt')
+        scheduler.add_method_stage('meta_learning', self.meta_learning_algorithm, 'optimize_learning')
+        scheduler.add_method_stage('ethics', self.ethical_intelligence, 'apply_ethics', args=({"situation": "Example"},))
+        scheduler.add_method_stage('file_io', self.file_system, 'save_file', args=("test.txt", "This is a test."))
+        scheduler.add_method_stage('chronicle', self.ai_chronicle_system, 'document_evolution',
+                                   args=("Initial run complete.",))
+        scheduler.add_method_stage('self_improvement', self.recursive_self_improvement, 'analyze_and_improve')
+        scheduler.add_method_stage('architecture_upgrades', self.self_enhancing_upgrades, 'modify_architecture')
+        scheduler.add_method_stage('multi_agent_fusion', self.multi_agent_ai_fusion, 'fuse_models')
+        scheduler.add_method_stage('memory_optimization', self.memory_management, 'optimize_memory')
+        scheduler.add_method_stage('autonomy', self.full_autonomy, 'execute')
+        scheduler.add_method_stage('perception', self.advanced_perception, 'execute')
+        scheduler.add_method_stage('ethics_decision', self.ethical_intelligence_module, 'make_ethics_decision',
+                                   args=({"situation": "Example"},))
+        scheduler.add_method_stage('system_control', self.system_control, 'execute')
+        report = scheduler.run()
+        failed = [name for name, entry in report["stages"].items() if entry["status"] != "completed"]
+        if failed:
+            logging.error(f"HOTARC run finished with incomplete stages: {', '.join(failed)}")
+        else:
             logging.info("HOTARC run completed successfully.")
-        except Exception as e:
-            logging.error(f"Error running HOTARC: {e}")
+        return report
 
 class QuantumAIAdaptability:
     def adapt(self):
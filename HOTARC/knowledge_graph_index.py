@@ -0,0 +1,214 @@
+import time
+import logging
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+class KnowledgeGraphIndex:
+    """
+    Frozen, query-optimized view of a knowledge graph. Concept labels are mapped to integer ids
+    and edges are stored as a CSR sparse adjacency matrix, so k-hop neighbourhoods, weighted
+    shortest paths and personalized PageRank run as sparse matrix operations, batched over
+    many seed concepts at once.
+    """
+    def __init__(self, labels, adjacency):
+        self.labels = list(labels)
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        self.adjacency = sparse.csr_matrix(adjacency, dtype=np.float64)
+        self._transition = None
+        self._dangling = None
+        self._costs = {}
+        logging.basicConfig(filename='knowledge_graph_index.log', level=logging.INFO)
+
+    @classmethod
+    def from_networkx(cls, graph, weight='weight'):
+        """
+        Freezes a networkx graph. Undirected graphs get a symmetric adjacency matrix.
+        """
+        start = time.perf_counter()
+        labels = list(graph.nodes())
+        index = {label: i for i, label in enumerate(labels)}
+        edges = list(graph.edges(data=weight, default=1.0))
+        rows = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+        cols = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+        weights = np.fromiter((w for _, _, w in edges), dtype=np.float64, count=len(edges))
+        if not graph.is_directed():
+            rows, cols, weights = np.concatenate([rows, cols]), np.concatenate([cols, rows]), np.concatenate([weights, weights])
+        adjacency = sparse.csr_matrix((weights, (rows, cols)), shape=(len(labels), len(labels)))
+        index = cls(labels, adjacency)
+        logging.info(f"Indexed {len(labels)} nodes and {len(edges)} edges in {time.perf_counter() - start:.3f}s.")
+        return index
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        Builds the index straight from a KnowledgeSnapshot's edge arrays, without going through networkx.
+        """
+        n = snapshot.num_nodes
+        rows = np.concatenate([snapshot.src, snapshot.dst])
+        cols = np.concatenate([snapshot.dst, snapshot.src])
+        weights = np.concatenate([snapshot.weight, snapshot.weight]).astype(np.float64)
+        # Keep one weight per node pair (the largest) rather than summing duplicate edges.
+        order = np.lexsort((-weights, cols, rows))
+        rows, cols, weights = rows[order], cols[order], weights[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        adjacency = sparse.csr_matrix((weights[first], (rows[first], cols[first])), shape=(n, n))
+        return cls(snapshot.labels, adjacency)
+
+    @property
+    def num_nodes(self):
+        return len(self.labels)
+
+    def ids(self, concepts):
+        """
+        Maps concept labels to integer ids. Raises KeyError for unknown concepts.
+        """
+        return np.asarray([self.label_index[concept] for concept in concepts], dtype=np.int64)
+
+    def k_hop(self, concepts, k=2, include_seeds=False):
+        """
+        Returns, for each seed concept, the concepts reachable within k hops as a dict of
+        label -> hop distance. All seeds are expanded together, one sparse product per hop.
+        """
+        hops = self.k_hop_matrix(self.ids(concepts), k)
+        results = {}
+        for row, concept in enumerate(concepts):
+            start, end = hops.indptr[row], hops.indptr[row + 1]
+            reached = {self.labels[i]: int(d) for i, d in zip(hops.indices[start:end], hops.data[start:end])}
+            if include_seeds:
+                reached[concept] = 0
+            results[concept] = reached
+        return results
+
+    def k_hop_matrix(self, seed_ids, k=2):
+        """
+        Sparse (seeds x nodes) matrix holding the hop distance (1..k) of every node reached from each seed.
+        Seeds themselves are not included.
+        """
+        structure = self.adjacency.copy()
+        structure.data = np.ones_like(structure.data)
+        num_seeds = len(seed_ids)
+        frontier = sparse.csr_matrix((np.ones(num_seeds), (np.arange(num_seeds), seed_ids)),
+                                     shape=(num_seeds, self.num_nodes))
+        visited = frontier.copy()
+        hops = sparse.csr_matrix((num_seeds, self.num_nodes))
+        for hop in range(1, k + 1):
+            reached = frontier @ structure
+            reached.data = np.ones_like(reached.data)
+            # Drop nodes already visited from the new frontier.
+            reached = reached - reached.multiply(visited)
+            reached.eliminate_zeros()
+            if reached.nnz == 0:
+                break
+            visited = visited + reached
+            hops = hops + reached * hop
+            frontier = reached
+        return hops.tocsr()
+
+    def cost_matrix(self, cost='inverse'):
+        """
+        Edge costs for path queries. Edge weights measure association strength, so the default
+        'inverse' cost is 1 / weight and strong relations make short paths. 'weight' uses the
+        raw weight, and a callable maps the weight array to costs. Edges whose cost is not a
+        finite positive number are dropped. Named costs are cached.
+        """
+        if cost == 'weight':
+            return self.adjacency
+        if callable(cost):
+            costs = cost(self.adjacency.data)
+        elif cost in self._costs:
+            return self._costs[cost]
+        elif cost == 'inverse':
+            weights = self.adjacency.data
+            costs = np.divide(1.0, weights, out=np.full_like(weights, np.inf), where=weights > 0)
+        else:
+            raise ValueError(f"Unknown cost {cost!r}. Expected 'inverse', 'weight' or a callable.")
+        matrix = self.adjacency.copy()
+        costs = np.asarray(costs, dtype=np.float64)
+        usable = np.isfinite(costs) & (costs > 0)
+        matrix.data = np.where(usable, costs, 0.0)
+        matrix.eliminate_zeros()
+        if isinstance(cost, str):
+            self._costs[cost] = matrix
+        return matrix
+
+    def shortest_paths(self, sources, targets=None, limit=np.inf, cost='inverse', include_source=False):
+        """
+        Weighted shortest-path distances from each source, computed in one batched Dijkstra call
+        over cost_matrix(cost). Returns a dict source -> {target: distance} for reachable targets;
+        the source itself is left out unless include_source is set.
+        """
+        source_ids = self.ids(sources)
+        distances = csgraph.dijkstra(self.cost_matrix(cost), directed=True, indices=source_ids, limit=limit)
+        target_ids = self.ids(targets) if targets is not None else None
+        results = {}
+        for row, source in enumerate(sources):
+            row_distances = distances[row]
+            candidates = target_ids if target_ids is not None else np.flatnonzero(np.isfinite(row_distances))
+            results[source] = {self.labels[i]: float(row_distances[i]) for i in candidates
+                               if np.isfinite(row_distances[i]) and (include_source or i != source_ids[row])}
+        return results
+
+    def shortest_path(self, source, target, cost='inverse'):
+        """
+        Returns the cheapest path from source to target under cost_matrix(cost) as a list of labels,
+        or None if unreachable.
+        """
+        source_id, target_id = self.ids([source, target])
+        _, predecessors = csgraph.dijkstra(self.cost_matrix(cost), directed=True, indices=source_id,
+                                           return_predecessors=True)
+        if source_id != target_id and predecessors[target_id] < 0:
+            return None
+        path = [target_id]
+        while path[-1] != source_id:
+            path.append(predecessors[path[-1]])
+        return [self.labels[i] for i in reversed(path)]
+
+    def _transition_matrix(self):
+        # Row-stochastic transition matrix, transposed so that one step is transition @ scores.
+        if self._transition is None:
+            out_weight = np.asarray(self.adjacency.sum(axis=1)).ravel()
+            inverse = np.divide(1.0, out_weight, out=np.zeros_like(out_weight), where=out_weight > 0)
+            self._transition = (sparse.diags(inverse) @ self.adjacency).T.tocsr()
+            self._dangling = out_weight == 0
+        return self._transition
+
+    def personalized_pagerank(self, seed_sets, alpha=0.85, tol=1e-8, max_iter=100):
+        """
+        Personalized PageRank for a batch of seed sets (each a list of concepts, or a single concept).
+        Returns a (len(seed_sets), num_nodes) array; all columns are iterated together.
+        """
+        transition = self._transition_matrix()
+        personalization = np.zeros((self.num_nodes, len(seed_sets)))
+        for column, seeds in enumerate(seed_sets):
+            seed_ids = self.ids([seeds] if isinstance(seeds, str) else seeds)
+            personalization[seed_ids, column] = 1.0 / len(seed_ids)
+        scores = personalization.copy()
+        for iteration in range(max_iter):
+            # Mass on dangling nodes is returned to the seeds, so a seed without out-edges keeps its
+            # restart mass rather than leaking it and leaving an all-zero vector.
+            dangling_mass = scores[self._dangling].sum(axis=0)
+            updated = alpha * (transition @ scores + personalization * dangling_mass) + (1 - alpha) * personalization
+            delta = np.abs(updated - scores).sum(axis=0).max()
+            scores = updated
+            if delta < tol:
+                break
+        logging.info(f"Personalized PageRank for {len(seed_sets)} seed sets converged after {iteration + 1} iterations.")
+        return scores.T
+
+    def top_related(self, seed_sets, top_k=10, alpha=0.85):
+        """
+        Returns, for each seed set, the top_k concepts by personalized PageRank, excluding the seeds
+        and any concept the seeds cannot reach (score 0).
+        """
+        scores = self.personalized_pagerank(seed_sets, alpha=alpha)
+        results = []
+        for column, seeds in enumerate(seed_sets):
+            row = scores[column].copy()
+            row[self.ids([seeds] if isinstance(seeds, str) else seeds)] = -np.inf
+            count = min(top_k, self.num_nodes)
+            best = np.argpartition(-row, count - 1)[:count] if count else np.empty(0, dtype=np.int64)
+            best = best[np.argsort(-row[best], kind='stable')]
+            results.append([(self.labels[i], float(row[i])) for i in best if np.isfinite(row[i]) and row[i] > 0])
+        return results
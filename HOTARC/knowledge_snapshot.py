@@ -0,0 +1,229 @@
+import os
+import csv
+import gzip
+import json
+import time
+import logging
+import numpy as np
+import networkx as nx
+
+class KnowledgeSnapshot:
+    """
+    Local, compact snapshot of ConceptNet edges. A CSV or JSONL dump is imported once into a
+    single .npz file of integer edge arrays and a UTF-8 label blob, which loads at startup
+    without network access. Nodes whose edges have been fetched from the API are recorded,
+    so refresh only queries nodes that have not been seen yet.
+    """
+    def __init__(self, path='conceptnet_snapshot.npz'):
+        self.path = path
+        self._reset()
+        self.timings = {"build_time": None, "load_time": None, "refresh_time": None}
+        logging.basicConfig(filename='knowledge_snapshot.log', level=logging.INFO)
+
+    def _reset(self):
+        self.labels = []
+        self.label_index = {}
+        self.relations = []
+        self.relation_index = {}
+        self.src = np.empty(0, dtype=np.int32)
+        self.dst = np.empty(0, dtype=np.int32)
+        self.rel = np.empty(0, dtype=np.int16)
+        self.weight = np.empty(0, dtype=np.float32)
+        self.fetched = set()
+        self._edge_keys = None
+
+    @property
+    def num_nodes(self):
+        return len(self.labels)
+
+    @property
+    def num_edges(self):
+        return len(self.src)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def import_dump(self, dump_path, language='en', relations=None, batch_size=100000):
+        """
+        Imports a ConceptNet assertions dump (tab-separated CSV, optionally gzipped, or JSONL of edges)
+        and saves the snapshot. Only edges whose endpoints are both in language are kept, optionally
+        limited to the given relation names.
+        """
+        start = time.perf_counter()
+        self._reset()
+        relations = set(relations) if relations else None
+        batch = []
+        for edge in self._read_dump(dump_path):
+            start_uri, end_uri, relation, weight = edge
+            if not (self._in_language(start_uri, language) and self._in_language(end_uri, language)):
+                continue
+            if relations is not None and relation not in relations:
+                continue
+            batch.append(edge)
+            if len(batch) >= batch_size:
+                self._append_edges(batch)
+                batch = []
+        self._append_edges(batch)
+        self.save()
+        self.timings["build_time"] = time.perf_counter() - start
+        logging.info(f"Imported {self.num_edges} edges over {self.num_nodes} nodes from {dump_path} "
+                     f"in {self.timings['build_time']:.3f}s.")
+        return self.report()
+
+    def _read_dump(self, dump_path):
+        opener = gzip.open if dump_path.endswith('.gz') else open
+        with opener(dump_path, 'rt', encoding='utf-8', newline='') as file:
+            if '.jsonl' in dump_path or '.json' in dump_path:
+                for line in file:
+                    if line.strip():
+                        yield self._parse_edge(json.loads(line))
+            else:
+                csv.field_size_limit(1 << 24)
+                for row in csv.reader(file, delimiter='\t'):
+                    if len(row) < 5:
+                        continue
+                    info = json.loads(row[4]) if row[4] else {}
+                    yield self._concept(row[2]), self._concept(row[3]), self._relation(row[1]), float(info.get('weight', 1.0))
+
+    def _parse_edge(self, edge):
+        # JSONL lines are either API-style edges (nested dicts) or flat {start, end, rel, weight} records.
+        start, end, rel = edge['start'], edge['end'], edge.get('rel', '')
+        start = start.get('@id', start.get('term', '')) if isinstance(start, dict) else start
+        end = end.get('@id', end.get('term', '')) if isinstance(end, dict) else end
+        rel = rel.get('@id', rel.get('label', '')) if isinstance(rel, dict) else rel
+        return self._concept(start), self._concept(end), self._relation(rel), float(edge.get('weight', 1.0))
+
+    def _concept(self, uri):
+        # /c/en/ice_cream/n/wn/food -> /c/en/ice_cream
+        return '/'.join(uri.split('/')[:4])
+
+    def _relation(self, uri):
+        return uri.rsplit('/', 1)[-1] if uri.startswith('/r/') else uri
+
+    def _in_language(self, uri, language):
+        return language is None or uri.startswith(f'/c/{language}/')
+
+    @staticmethod
+    def label_for(uri):
+        return uri.split('/')[3].replace('_', ' ') if uri.count('/') >= 3 else uri
+
+    def _node_id(self, uri):
+        label = self.label_for(uri)
+        node_id = self.label_index.get(label)
+        if node_id is None:
+            node_id = len(self.labels)
+            self.label_index[label] = node_id
+            self.labels.append(label)
+        return node_id
+
+    def _relation_id(self, relation):
+        relation_id = self.relation_index.get(relation)
+        if relation_id is None:
+            relation_id = len(self.relations)
+            self.relation_index[relation] = relation_id
+            self.relations.append(relation)
+        return relation_id
+
+    def _append_edges(self, edges):
+        if self._edge_keys is None:
+            self._edge_keys = set(zip(self.src.tolist(), self.dst.tolist(), self.rel.tolist()))
+        src, dst, rel, weight = [], [], [], []
+        for start_uri, end_uri, relation, edge_weight in edges:
+            key = (self._node_id(start_uri), self._node_id(end_uri), self._relation_id(relation))
+            if key in self._edge_keys:
+                continue
+            self._edge_keys.add(key)
+            src.append(key[0])
+            dst.append(key[1])
+            rel.append(key[2])
+            weight.append(edge_weight)
+        if src:
+            self.src = np.concatenate([self.src, np.asarray(src, dtype=np.int32)])
+            self.dst = np.concatenate([self.dst, np.asarray(dst, dtype=np.int32)])
+            self.rel = np.concatenate([self.rel, np.asarray(rel, dtype=np.int16)])
+            self.weight = np.concatenate([self.weight, np.asarray(weight, dtype=np.float32)])
+        return len(src)
+
+    def _encode_strings(self, strings):
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in encoded], out=offsets[1:])
+        return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+    def _decode_strings(self, blob, offsets):
+        data = blob.tobytes()
+        return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    def save(self):
+        """
+        Writes the snapshot to a temporary file and renames it over the previous one.
+        """
+        label_blob, label_offsets = self._encode_strings(self.labels)
+        relation_blob, relation_offsets = self._encode_strings(self.relations)
+        fetched_blob, fetched_offsets = self._encode_strings(sorted(self.fetched))
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.savez(file, src=self.src, dst=self.dst, rel=self.rel, weight=self.weight,
+                     label_blob=label_blob, label_offsets=label_offsets,
+                     relation_blob=relation_blob, relation_offsets=relation_offsets,
+                     fetched_blob=fetched_blob, fetched_offsets=fetched_offsets)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        logging.info(f"Saved snapshot with {self.num_edges} edges to {self.path}.")
+
+    def load(self):
+        """
+        Loads the snapshot from disk. No network access is needed.
+        """
+        start = time.perf_counter()
+        with np.load(self.path, allow_pickle=False) as data:
+            self.src, self.dst, self.rel, self.weight = data['src'], data['dst'], data['rel'], data['weight']
+            self.labels = self._decode_strings(data['label_blob'], data['label_offsets'])
+            self.relations = self._decode_strings(data['relation_blob'], data['relation_offsets'])
+            self.fetched = set(self._decode_strings(data['fetched_blob'], data['fetched_offsets']))
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        self.relation_index = {relation: i for i, relation in enumerate(self.relations)}
+        self._edge_keys = None
+        self.timings["load_time"] = time.perf_counter() - start
+        logging.info(f"Loaded snapshot with {self.num_edges} edges over {self.num_nodes} nodes "
+                     f"in {self.timings['load_time']:.3f}s.")
+        return self
+
+    def unfetched(self, nodes):
+        return [node for node in nodes if node not in self.fetched]
+
+    def refresh(self, client, nodes, limit=100):
+        """
+        Fetches edges from the ConceptNet API for the nodes that have not been fetched before,
+        adds them to the snapshot and saves it. Returns the number of new edges.
+        """
+        start = time.perf_counter()
+        added = 0
+        missing = self.unfetched(nodes)
+        for node in missing:
+            edges = client.edges(start=node, limit=limit)
+            added += self._append_edges(self._parse_edge(edge) for edge in edges)
+            self.fetched.add(node)
+        if missing:
+            self.save()
+        self.timings["refresh_time"] = time.perf_counter() - start
+        logging.info(f"Refreshed {len(missing)} of {len(nodes)} nodes, {added} new edges "
+                     f"in {self.timings['refresh_time']:.3f}s.")
+        return added
+
+    def to_networkx(self, graph=None):
+        """
+        Adds all edges to a networkx graph (a new nx.Graph by default), keyed by concept label.
+        """
+        graph = nx.Graph() if graph is None else graph
+        labels = self.labels
+        graph.add_weighted_edges_from((labels[s], labels[d], w) for s, d, w in
+                                      zip(self.src.tolist(), self.dst.tolist(), self.weight.tolist()))
+        return graph
+
+    def report(self):
+        report = dict(self.timings)
+        report.update({"nodes": self.num_nodes, "edges": self.num_edges, "fetched_nodes": len(self.fetched),
+                       "bytes": os.path.getsize(self.path) if self.exists() else 0})
+        return report
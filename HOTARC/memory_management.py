@@ -1,24 +1,276 @@
+import os
+import json
+import time
+import threading
 import numpy as np
 import faiss
 import logging
+from memory_store import ColumnarMemory, MemoryChunk
+
+INDEX_TYPES = {
+    'flat': 'Flat',
+    'ivf_flat': 'IVF{nlist},Flat',
+    'ivf_pq': 'IVF{nlist},PQ{pq_m}',
+    'hnsw': 'HNSW{hnsw_m}',
+    'sq8': 'SQ8',
+}
+
+# The index is the only copy of the vectors; vector_dtype='float16'/'int8' stores them as scalar-quantized
+# codes of that precision. ivf_pq and sq8 are compressed already.
+QUANTIZED_INDEX_TYPES = {
+    'float16': {'flat': 'SQfp16', 'ivf_flat': 'IVF{nlist},SQfp16', 'hnsw': 'HNSW{hnsw_m},SQfp16'},
+    'int8': {'flat': 'SQ8', 'ivf_flat': 'IVF{nlist},SQ8', 'hnsw': 'HNSW{hnsw_m},SQ8'},
+}
+
+class RecallResult:
+    """
+    Result of a batched recall: (Q, k) arrays of distances and memory ids, with -1 for
+    empty slots. Payloads are only looked up when requested.
+    """
+    def __init__(self, distances, ids, memory):
+        self.distances = distances
+        self.ids = ids
+        self.memory = memory
+
+    def __len__(self):
+        return len(self.ids)
+
+    def memories(self, row):
+        """
+        Returns the (vector, data) memories recalled for query row.
+        """
+        return [self.memory[memory_id] for memory_id in self.ids[row].tolist() if memory_id in self.memory]
+
+    def payloads(self, row):
+        return [data for _, data in self.memories(row)]
+
+VECTOR_DTYPES = ('float32', 'float16', 'int8')
+
+# IVF indexes keep external ids in their inverted lists. Wrapping them in IndexIDMap2 would
+# misnumber entries after remove_ids, so they are used unwrapped.
+NATIVE_ID_INDEX_TYPES = ('ivf_flat', 'ivf_pq')
+
+_omp_lock = threading.Lock()
 
 class MemoryManagement:
-    def __init__(self):
-        self.memory = []
+    """
+    Vector memory recall over a FAISS index. index_type is one of flat, ivf_flat, ivf_pq, hnsw
+    or sq8; the approximate types are trained automatically once train_size vectors are present.
+    Memories carry stable integer ids, and the index holds the only copy of each vector
+    (vector_dtype='float16' or 'int8' stores them as scalar-quantized codes), while payloads and
+    the recency/access signals used for eviction live in a columnar store (see memory_store.py).
+    """
+    def __init__(self, index_type='flat', nlist=100, pq_m=16, hnsw_m=32, nprobe=8, ef_search=64, train_size=None,
+                 max_memories=10000, eviction_fraction=0.1, recency_scale=3600.0, segment_size=65536,
+                 vector_dtype='float32', tombstone_fraction=0.25, index_delta_fraction=0.1):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type}. Expected one of {sorted(INDEX_TYPES)}")
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype {vector_dtype}. Expected one of {VECTOR_DTYPES}")
         self.vector_dim = 128  # Dimension of the vector embeddings
-        self.index = faiss.IndexFlatL2(self.vector_dim)
+        self.vector_dtype = vector_dtype
+        # Stable memory id -> (vector, data). Payloads and signals are stored column-wise in chunks
+        # of segment_size ids; the vectors themselves are held only by the FAISS index.
+        self.memory = ColumnarMemory(self._vectors, segment_size)
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.train_size = train_size if train_size is not None else self._default_train_size(index_type)
+        self.max_memories = max_memories
+        self.eviction_fraction = eviction_fraction
+        self.recency_scale = recency_scale
+        # Ids removed from an index that cannot delete in place (HNSW) are tombstoned and filtered
+        # out at search time; the index is rebuilt once they exceed tombstone_fraction of its entries.
+        self.tombstone_fraction = tombstone_fraction
+        self.tombstones = set()
+        self.search_parameters = None
+        self.next_id = 0
+
+        # Persistence state: segments of segment_size consecutive ids are saved independently,
+        # and only segments touched since the last save are rewritten. Index changes since the
+        # last full index write are saved as append-only delta files (added ids with their input
+        # vectors, removed ids); index_dirty forces a full write, which happens once the deltas
+        # exceed index_delta_fraction of the index entries.
+        self.segment_size = segment_size
+        self.dirty_segments = set()
+        self.index_delta_fraction = index_delta_fraction
+        self.delta_added = []
+        self.delta_removed = []
+        self.delta_files = []
+        self.delta_entries = 0
+        self.index_dirty = True
+        self.signals_dirty = True
+        self.segment_versions = {}
+        self.index_path = None
+        self.index_read_only = False
+
+        self.index = self._build_index(index_type, quantized=True)
+        self.trained = self.index.is_trained
+        if not self.trained:
+            # Untrained index types need enough vectors first; search a flat index until then.
+            self.pending_index = self.index
+            self.index = self._build_index('flat')
+        self._apply_search_params()
         logging.basicConfig(filename='memory_management.log', level=logging.INFO)
 
+    def _default_train_size(self, index_type):
+        if index_type == 'ivf_pq':
+            return max(39 * self.nlist, 39 * 256)  # PQ codebooks have 256 centroids per sub-quantizer
+        if index_type == 'ivf_flat':
+            return 39 * self.nlist
+        return 1000
+
+    def _build_index(self, index_type, nlist=None, with_ids=True, quantized=False):
+        spec = QUANTIZED_INDEX_TYPES.get(self.vector_dtype, {}).get(index_type) if quantized else None
+        spec = (spec or INDEX_TYPES[index_type]).format(nlist=nlist or self.nlist, pq_m=self.pq_m, hnsw_m=self.hnsw_m)
+        index = faiss.index_factory(self.vector_dim, spec, faiss.METRIC_L2)
+        if not with_ids:
+            return index
+        if index_type in NATIVE_ID_INDEX_TYPES:
+            # A hashtable direct map lets vectors be reconstructed by id.
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            return index
+        return faiss.IndexIDMap2(index)
+
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """
+        Tunes the accuracy/speed trade-off of the approximate index types:
+        nprobe for the IVF indexes and efSearch for HNSW.
+        """
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        self.search_parameters = None
+        self._apply_search_params()
+
+    def _apply_search_params(self, index=None, index_type=None):
+        index = index if index is not None else self.index
+        index_type = index_type or (self.index_type if self.trained else 'flat')
+        if isinstance(index, faiss.IndexIDMap):
+            index = faiss.downcast_index(index.index)
+        params = faiss.ParameterSpace()
+        if index_type in ('ivf_flat', 'ivf_pq'):
+            params.set_index_parameter(index, 'nprobe', self.nprobe)
+        elif index_type == 'hnsw':
+            params.set_index_parameter(index, 'efSearch', self.ef_search)
+
+    def _vectors(self, ids):
+        """
+        Vectors for the given ids, reconstructed from the index, which is the only copy.
+        Quantized index types (ivf_pq, sq8 or a float16/int8 vector_dtype) return their decoded approximation.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return np.empty((0, self.vector_dim), dtype=np.float32)
+        return self.index.reconstruct_batch(ids)
+
+    def _memory_vectors(self):
+        return self._vectors(self._memory_ids())
+
+    def _memory_ids(self):
+        return self.memory.live_ids()
+
+    def _maybe_train(self):
+        """
+        Trains the configured index once enough vectors are present and swaps it in.
+        """
+        if self.trained or len(self.memory) < self.train_size:
+            return
+        ids = self._memory_ids()
+        vectors = self._vectors(ids)
+        start = time.perf_counter()
+        self.pending_index.train(vectors)
+        self.pending_index.add_with_ids(vectors, ids)
+        self.index = self.pending_index
+        self.pending_index = None
+        self.trained = True
+        self.index_dirty = True
+        self._apply_search_params()
+        logging.info(f"Trained {self.index_type} index on {len(vectors)} vectors in {time.perf_counter() - start:.3f}s")
+
+    def _touch(self, ids):
+        if len(ids):
+            self.memory.touch(ids)
+            self.signals_dirty = True
+
     def add_memory(self, vector, data):
         """
-        Adds a new memory vector and its associated data.
+        Adds a new memory vector and its associated data. Returns the stable memory id.
         """
         if len(vector) != self.vector_dim:
             raise ValueError(f"Vector must be of dimension {self.vector_dim}")
-        self.memory.append((vector, data))
-        self.index.add(np.array([vector]))
+        ids = self._insert(np.array([vector], dtype=np.float32), [data])
         logging.info(f"Added new memory. Total memories: {len(self.memory)}")
+        self._maybe_train()
         self._manage_memory()
+        return int(ids[0])
+
+    def add_memories(self, matrix, data_list):
+        """
+        Adds a batch of memory vectors and their associated data with a single FAISS call.
+        Accepts an (N, vector_dim) float32 array or any buffer exposing one; C-contiguous
+        float32 input is used as-is without copying. Returns the stable memory ids.
+        """
+        vectors = np.ascontiguousarray(matrix, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.vector_dim:
+            raise ValueError(f"Matrix must have shape (N, {self.vector_dim})")
+        if len(data_list) != vectors.shape[0]:
+            raise ValueError("Matrix rows and data_list must have the same length")
+        if vectors.shape[0] == 0:
+            return np.empty(0, dtype=np.int64)
+        ids = self._insert(vectors, data_list)
+        logging.info(f"Added {vectors.shape[0]} memories. Total memories: {len(self.memory)}")
+        self._maybe_train()
+        self._manage_memory()
+        return ids
+
+    def _insert(self, vectors, data_list):
+        self._ensure_writable()
+        ids = np.arange(self.next_id, self.next_id + len(vectors), dtype=np.int64)
+        self.next_id += len(vectors)
+        self.memory.append(ids, data_list)
+        self.index.add_with_ids(vectors, ids)
+        self._mark_dirty(ids)
+        self._record_delta(added=(ids, vectors))
+        return ids
+
+    def _mark_dirty(self, ids):
+        self.dirty_segments.update(np.unique(np.asarray(ids, dtype=np.int64) // self.segment_size).tolist())
+        self.signals_dirty = True
+
+    def _record_delta(self, added=None, removed=None):
+        """
+        Buffers an index change for the next delta file. Nothing is buffered (or copied) while a
+        full index write is pending, and a buffer that outgrows index_delta_fraction turns into one.
+        """
+        if self.index_dirty or self.index_path is None:
+            return
+        count = (len(added[0]) if added is not None else 0) + (len(removed) if removed is not None else 0)
+        if self.delta_entries + count > self.index_delta_fraction * max(self.index.ntotal, 1):
+            self.index_dirty = True
+            self.delta_added = []
+            self.delta_removed = []
+            return
+        if added is not None:
+            # Inserts use the caller's matrix without copying; only a buffered delta needs its own copy.
+            ids, vectors = added
+            self.delta_added.append((ids, vectors.copy()))
+        if removed is not None:
+            self.delta_removed.append(removed)
+        self.delta_entries += count
+
+    def _ensure_writable(self):
+        """
+        Replaces a memory-mapped, read-only index with a fully loaded copy before it is modified.
+        """
+        if self.index_read_only:
+            self.index = faiss.read_index(self.index_path)
+            self._apply_search_params()
+            self.index_read_only = False
 
     def recall_memory(self, vector, k=5):
         """
@@ -26,44 +278,356 @@ class MemoryManagement:
         """
         if len(vector) != self.vector_dim:
             raise ValueError(f"Vector must be of dimension {self.vector_dim}")
-        distances, indices = self.index.search(np.array([vector]), k)
-        recalled_memories = [self.memory[i] for i in indices[0] if i < len(self.memory)]
+        distances, ids = self._search(np.array([vector], dtype=np.float32), k)
+        found = [int(memory_id) for memory_id in ids[0] if memory_id in self.memory]
+        self._touch(found)
+        recalled_memories = [self.memory[memory_id] for memory_id in found]
         logging.info(f"Recalled {len(recalled_memories)} memories.")
         return recalled_memories
 
+    def recall_many(self, queries, k=5, num_threads=None, touch=True):
+        """
+        Recalls the top k memories for a (Q, vector_dim) matrix of queries with a single FAISS search.
+        num_threads sets the OpenMP thread count for this search only. Returns a RecallResult.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != self.vector_dim:
+            raise ValueError(f"Queries must have shape (Q, {self.vector_dim})")
+        if num_threads is None:
+            distances, ids = self._search(queries, k)
+        else:
+            with _omp_lock:
+                previous = faiss.omp_get_max_threads()
+                faiss.omp_set_num_threads(num_threads)
+                try:
+                    distances, ids = self._search(queries, k)
+                finally:
+                    faiss.omp_set_num_threads(previous)
+        if touch:
+            self._touch(np.unique(ids[ids >= 0]).tolist())
+        logging.debug(f"Recalled top {k} memories for {len(queries)} queries.")
+        return RecallResult(distances, ids, self.memory)
+
+    def _search(self, queries, k):
+        if not self.tombstones:
+            return self.index.search(queries, k)
+        if self.search_parameters is None:
+            # Keep the selectors referenced: the search parameters only hold raw pointers to them.
+            tombstoned = faiss.IDSelectorBatch(np.fromiter(self.tombstones, dtype=np.int64, count=len(self.tombstones)))
+            live = faiss.IDSelectorNot(tombstoned)
+            if self.trained and self.index_type == 'hnsw':
+                params = faiss.SearchParametersHNSW(sel=live, efSearch=self.ef_search)
+            else:
+                params = faiss.SearchParameters(sel=live)
+            self.search_parameters = (params, live, tombstoned)
+        return self.index.search(queries, k, params=self.search_parameters[0])
+
     def _manage_memory(self):
         """
         Manages the memory by organizing hierarchically and removing outdated information.
         """
-        if len(self.memory) > 10000:  # Example threshold for memory size
+        if len(self.memory) > self.max_memories:
             self._discard_outdated_memories()
 
     def _discard_outdated_memories(self):
         """
-        Discards outdated memories based on relevance and timestamp.
+        Discards the least relevant memories, bringing the store down to
+        (1 - eviction_fraction) of max_memories so eviction runs in batches.
         """
-        relevance_scores = [self._compute_relevance(memory) for memory in self.memory]
-        threshold = np.percentile(relevance_scores, 10)  # Keep top 90% relevant memories
-        new_memory = [(v, d) for (v, d), score in zip(self.memory, relevance_scores) if score > threshold]
-        self.memory = new_memory
-        self._rebuild_index()
-        logging.info(f"Discarded outdated memories. Total memories: {len(self.memory)}")
+        target = int(self.max_memories * (1 - self.eviction_fraction))
+        num_evict = len(self.memory) - target
+        if num_evict <= 0:
+            return
+        ids, last_access, access_count = self.memory.signals()
+        scores = self._relevance_scores(last_access, access_count)
+        self.remove_memories(ids[np.argpartition(scores, num_evict - 1)[:num_evict]])
+        logging.info(f"Discarded {num_evict} outdated memories. Total memories: {len(self.memory)}")
 
-    def _compute_relevance(self, memory):
+    def _relevance_scores(self, last_access, access_count):
         """
-        Computes the relevance of a memory. Placeholder for actual relevance computation logic.
+        Scores memories from their access count and the time since they were last accessed.
         """
-        return np.random.rand()  # Replace with actual relevance logic
+        age = time.time() - last_access
+        return np.log1p(access_count) - age / self.recency_scale
+
+    def remove_memories(self, ids):
+        """
+        Removes the given memory ids from the index and the payload store. On HNSW the ids are
+        tombstoned and skipped at search time until they pass tombstone_fraction of the index,
+        which then triggers a single rebuild.
+        """
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        if len(ids) == 0:
+            return
+        self._ensure_writable()
+        if self.memory.remove(ids) == 0:
+            return
+        self._mark_dirty(ids)
+        self._record_delta(removed=ids)
+        try:
+            self.index.remove_ids(ids)
+        except RuntimeError:
+            # Some index types (e.g. HNSW) cannot remove entries in place: tombstone them instead
+            # of rebuilding the whole index on every eviction.
+            self.tombstones.update(ids.tolist())
+            self.search_parameters = None
+            if len(self.tombstones) > self.tombstone_fraction * self.index.ntotal:
+                self._rebuild_index()
 
     def _rebuild_index(self):
         """
         Rebuilds the FAISS index with the current memory.
         """
+        self._ensure_writable()
+        self.index_dirty = True
+        ids = self._memory_ids()
+        vectors = self._vectors(ids)
         self.index.reset()
-        for vector, _ in self.memory:
-            self.index.add(np.array([vector]))
+        if self.memory:
+            self.index.add_with_ids(vectors, ids)
+        self.tombstones = set()
+        self.search_parameters = None
         logging.info("Rebuilt FAISS index.")
 
+    def save(self, directory):
+        """
+        Checkpoints the memory store to a directory. Only segments changed since the
+        last save are written, and the signals file only if it changed. Inserts and removals
+        since the last save are appended to the index as a small delta file; the whole index is
+        only rewritten (and the deltas dropped) after training, a rebuild, or once the deltas
+        exceed index_delta_fraction of its entries. Segment files are versioned and meta.json
+        is replaced last, so an interrupted save leaves the previous checkpoint intact.
+        """
+        os.makedirs(directory, exist_ok=True)
+        start = time.perf_counter()
+        # First save to this directory: everything must be written.
+        new_directory = self.index_path != os.path.join(directory, 'index.faiss')
+        old_files = []
+        if self.index_dirty or new_directory or not os.path.exists(os.path.join(directory, 'index.faiss')):
+            # Before training this is the interim flat index; either way it holds the only copy of the vectors.
+            index = self.index
+            self._write_atomic(os.path.join(directory, 'index.faiss'), lambda path: faiss.write_index(index, path))
+            if not new_directory:
+                old_files.extend(self._delta_path(directory, number) for number in self.delta_files)
+            self.delta_files = []
+            self.delta_entries = 0
+            self.index_dirty = False
+        elif self.delta_added or self.delta_removed:
+            self._write_delta(directory)
+        self.delta_added = []
+        self.delta_removed = []
+
+        dirty = set(self.dirty_segments)
+        if new_directory:
+            dirty = set(self.memory.chunks)
+        for number in sorted(dirty):
+            chunk = self.memory.chunks.get(number)
+            old_files.extend(self._segment_files(directory, number, self.segment_versions.get(number)))
+            if chunk is None or chunk.live_count == 0:
+                self.segment_versions.pop(number, None)
+                continue
+            version = self.segment_versions.get(number, -1) + 1
+            chunk.save(self._segment_prefix(directory, number, version))
+            self.segment_versions[number] = version
+
+        if self.signals_dirty or new_directory or not os.path.exists(os.path.join(directory, 'signals.npz')):
+            ids, last_access, access_count = self.memory.signals()
+            self._write_atomic(os.path.join(directory, 'signals.npz'),
+                               lambda path: self._write_npz(path, ids=ids, last_access=last_access, access_count=access_count))
+            self.signals_dirty = False
+
+        meta = {
+            "index_type": self.index_type, "nlist": self.nlist, "pq_m": self.pq_m, "hnsw_m": self.hnsw_m,
+            "nprobe": self.nprobe, "ef_search": self.ef_search, "train_size": self.train_size,
+            "trained": self.trained, "next_id": self.next_id, "segment_size": self.segment_size,
+            "vector_dtype": self.vector_dtype, "max_memories": self.max_memories,
+            "eviction_fraction": self.eviction_fraction, "recency_scale": self.recency_scale,
+            "tombstone_fraction": self.tombstone_fraction, "index_delta_fraction": self.index_delta_fraction,
+            "index_deltas": self.delta_files, "index_delta_entries": self.delta_entries,
+            "segments": {str(number): version for number, version in self.segment_versions.items()},
+        }
+        self._write_atomic(os.path.join(directory, 'meta.json'), lambda path: self._write_json(path, meta))
+        for path in old_files:
+            if os.path.exists(path):
+                os.remove(path)
+        self.dirty_segments.clear()
+        self.index_path = os.path.join(directory, 'index.faiss')
+        logging.info(f"Saved memory store to {directory}: {len(dirty)} segments written in {time.perf_counter() - start:.3f}s")
+
+    def _write_delta(self, directory):
+        """
+        Appends the buffered index changes as the next delta file. Ids added and removed again since
+        the last save are dropped; removed ids are kept since they may be in the base index.
+        """
+        removed = np.concatenate(self.delta_removed) if self.delta_removed else np.empty(0, dtype=np.int64)
+        if self.delta_added:
+            ids = np.concatenate([ids for ids, _ in self.delta_added])
+            vectors = np.concatenate([vectors for _, vectors in self.delta_added])
+            live = ~np.isin(ids, removed)
+            ids, vectors = ids[live], vectors[live]
+        else:
+            ids, vectors = np.empty(0, dtype=np.int64), np.empty((0, self.vector_dim), dtype=np.float32)
+        number = self.delta_files[-1] + 1 if self.delta_files else 0
+        self._write_atomic(self._delta_path(directory, number),
+                           lambda path: self._write_npz(path, ids=ids, vectors=vectors, removed=removed))
+        self.delta_files.append(number)
+
+    def _apply_deltas(self, directory):
+        for number in self.delta_files:
+            delta = np.load(self._delta_path(directory, number))
+            if len(delta["removed"]):
+                try:
+                    self.index.remove_ids(delta["removed"])
+                except RuntimeError:
+                    # HNSW cannot remove in place; load() tombstones entries missing from the store.
+                    pass
+            if len(delta["ids"]):
+                self.index.add_with_ids(delta["vectors"], delta["ids"])
+
+    def _delta_path(self, directory, number):
+        return os.path.join(directory, f"index_delta_{number:08d}.npz")
+
+    def load(self, directory, mmap=True):
+        """
+        Loads a saved memory store. With mmap=True the index is opened with FAISS's
+        mmap read flags and segment files are memory-mapped, so entries are paged in on demand.
+        """
+        start = time.perf_counter()
+        with open(os.path.join(directory, 'meta.json'), 'r') as file:
+            meta = json.load(file)
+        for key in ("index_type", "nlist", "pq_m", "hnsw_m", "nprobe", "ef_search", "train_size", "trained",
+                    "next_id", "segment_size", "vector_dtype"):
+            setattr(self, key, meta[key])
+        # Checkpoints written before these settings were persisted keep the constructor's values.
+        for key in ("max_memories", "eviction_fraction", "recency_scale", "tombstone_fraction", "index_delta_fraction"):
+            if key in meta:
+                setattr(self, key, meta[key])
+        self.delta_files = meta.get("index_deltas", [])
+        self.delta_entries = meta.get("index_delta_entries", 0)
+        self.delta_added = []
+        self.delta_removed = []
+        self.segment_versions = {int(number): version for number, version in meta["segments"].items()}
+
+        self.memory = ColumnarMemory(self._vectors, self.segment_size)
+        for number, version in self.segment_versions.items():
+            chunk = MemoryChunk.load(self._segment_prefix(directory, number, version), mmap)
+            self.memory.chunks[number] = chunk
+            self.memory.live_count += chunk.live_count
+
+        self.index_path = os.path.join(directory, 'index.faiss')
+        self.index_read_only = False
+        if mmap:
+            try:
+                self.index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                self.index_read_only = True
+            except RuntimeError as e:
+                logging.warning(f"Index type does not support mmap loading, reading fully: {e}")
+                self.index = faiss.read_index(self.index_path)
+        else:
+            self.index = faiss.read_index(self.index_path)
+        if self.delta_files:
+            # Deltas are folded into a loaded copy; the next full index write makes mmap loading possible again.
+            self._ensure_writable()
+            self._apply_deltas(directory)
+        self.pending_index = None if self.trained else self._build_index(self.index_type, quantized=True)
+        self._apply_search_params()
+        # Entries still in the index but no longer in the store are tombstones from before the save.
+        self.tombstones = set()
+        self.search_parameters = None
+        if isinstance(self.index, faiss.IndexIDMap):
+            stored = faiss.vector_to_array(self.index.id_map)
+            self.tombstones = set(np.setdiff1d(stored, self._memory_ids()).tolist())
+
+        signals = np.load(os.path.join(directory, 'signals.npz'))
+        self.memory.restore_signals(signals["ids"], signals["last_access"], signals["access_count"])
+        self.dirty_segments = set()
+        self.index_dirty = False
+        self.signals_dirty = False
+        logging.info(f"Loaded {len(self.memory)} memories from {directory} in {time.perf_counter() - start:.3f}s")
+
+    def _segment_prefix(self, directory, number, version):
+        return os.path.join(directory, f"segment_{number:08d}.v{version}")
+
+    def _segment_files(self, directory, number, version):
+        if version is None:
+            return []
+        prefix = self._segment_prefix(directory, number, version)
+        return [f"{prefix}.{suffix}" for suffix in ("ids.npy", "offsets.npy", "payloads.bin")]
+
+    def memory_footprint(self, include_index=True):
+        """
+        Reports the bytes held per memory by the column store (payloads and signals) and the
+        FAISS index, which holds the vectors and is measured by serializing it.
+        include_index=False skips that step and reports the store only.
+        """
+        count = len(self.memory)
+        sizes = self.memory.nbytes()
+        store = sizes["columns"] + sizes["payloads"]
+        index_bytes = int(faiss.serialize_index(self.index).nbytes) if include_index else 0
+        total = store + index_bytes
+        report = {"memories": count, "vector_dtype": self.vector_dtype, "column_bytes": sizes["columns"], "payload_bytes": sizes["payloads"], "store_bytes": store,
+                  "index_bytes": index_bytes if include_index else None, "total_bytes": total,
+                  "bytes_per_memory": total / count if count else 0.0}
+        logging.info(f"Memory footprint: {report}")
+        return report
+
+    def _write_atomic(self, path, writer):
+        temp_path = path + '.tmp'
+        writer(temp_path)
+        fd = os.open(temp_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(temp_path, path)
+
+    def _write_npz(self, path, **arrays):
+        # Through a file object, so np.savez does not append .npz to the temporary name.
+        with open(path, 'wb') as file:
+            np.savez(file, **arrays)
+
+    def _write_json(self, path, data):
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+    def benchmark_index_types(self, index_types=None, queries=None, num_queries=100, k=10):
+        """
+        Builds each index type over the current memories and reports recall@k against the
+        exact flat index, average search latency per query and build time.
+        """
+        vectors = self._memory_vectors()
+        if len(vectors) == 0:
+            raise ValueError("No memories to benchmark against")
+        if queries is None:
+            queries = vectors[np.random.choice(len(vectors), min(num_queries, len(vectors)), replace=False)]
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        k = min(k, len(vectors))
+        flat = faiss.IndexFlatL2(self.vector_dim)
+        flat.add(vectors)
+        _, ground_truth = flat.search(queries, k)
+
+        report = {}
+        for index_type in index_types or list(INDEX_TYPES):
+            try:
+                nlist = max(1, min(self.nlist, len(vectors) // 39))
+                index = self._build_index(index_type, nlist=nlist, with_ids=False)
+                start = time.perf_counter()
+                if not index.is_trained:
+                    index.train(vectors)
+                index.add(vectors)
+                build_time = time.perf_counter() - start
+                self._apply_search_params(index, index_type)
+                start = time.perf_counter()
+                _, ids = index.search(queries, k)
+                latency = (time.perf_counter() - start) / len(queries)
+                recall = np.mean([len(np.intersect1d(found, truth)) / k for found, truth in zip(ids, ground_truth)])
+                report[index_type] = {"recall": float(recall), "latency_ms": latency * 1000, "build_time": build_time}
+                logging.info(f"Index {index_type}: recall@{k}={recall:.3f}, latency={latency * 1000:.3f}ms, build={build_time:.3f}s")
+            except Exception as e:
+                logging.error(f"Error benchmarking index type {index_type}: {e}")
+                report[index_type] = {"error": str(e)}
+        return report
+
     def initialize(self):
         """
         Initializes memory management.
@@ -0,0 +1,290 @@
+import os
+import time
+import pickle
+import numpy as np
+
+class MemoryChunk:
+    """
+    Columnar storage for up to chunk_size consecutive memory ids.
+    Rows are kept in id order, so lookups are a binary search over the ids column.
+    Payloads live in a single blob addressed by an offsets column; vectors are not stored
+    here but in the FAISS index. Removed rows are tombstoned and reclaimed by compact().
+    """
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.live_count = 0
+        self.read_only = False
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.blob = bytearray()
+        self.live = np.zeros(capacity, dtype=bool)
+        self.last_access = np.zeros(capacity, dtype=np.float64)
+        self.access_count = np.zeros(capacity, dtype=np.uint32)
+
+    def _grow(self, needed):
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        self.ids = self._resized(self.ids, capacity)
+        self.offsets = self._resized(self.offsets, capacity + 1)
+        self.live = self._resized(self.live, capacity)
+        self.last_access = self._resized(self.last_access, capacity)
+        self.access_count = self._resized(self.access_count, capacity)
+
+    def _resized(self, array, length):
+        resized = np.zeros((length,) + array.shape[1:], dtype=array.dtype)
+        count = min(len(array), length)
+        resized[:count] = array[:count]
+        return resized
+
+    def materialize(self):
+        """
+        Copies memory-mapped columns into RAM so the chunk can be modified.
+        """
+        if not self.read_only:
+            return
+        self.ids = np.array(self.ids)
+        self.offsets = np.array(self.offsets)
+        self.blob = bytearray(self.blob)
+        self.read_only = False
+
+    def append(self, ids, payloads, now):
+        self.materialize()
+        start = self.count
+        end = start + len(ids)
+        self._grow(end)
+        self.ids[start:end] = ids
+        lengths = np.fromiter((len(payload) for payload in payloads), dtype=np.int64, count=len(payloads))
+        self.offsets[start + 1:end + 1] = self.offsets[start] + np.cumsum(lengths)
+        self.blob.extend(b''.join(payloads))
+        self.live[start:end] = True
+        self.last_access[start:end] = now
+        self.access_count[start:end] = 0
+        self.count = end
+        self.live_count += len(ids)
+
+    def find(self, ids):
+        """
+        Returns the rows of the given ids and a mask of which ids are live in this chunk.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids[:self.count], ids)
+        rows = np.minimum(rows, max(self.count - 1, 0))
+        found = (self.ids[rows] == ids) & self.live[rows] if self.count else np.zeros(len(ids), dtype=bool)
+        return rows, found
+
+    def payload(self, row):
+        return pickle.loads(bytes(self.blob[self.offsets[row]:self.offsets[row + 1]]))
+
+    def payload_bytes(self, row):
+        return bytes(self.blob[self.offsets[row]:self.offsets[row + 1]])
+
+    def remove(self, rows):
+        rows = rows[self.live[rows]]
+        self.live[rows] = False
+        self.live_count -= len(rows)
+        if self.count > 64 and self.live_count < self.count // 2:
+            self.compact()
+
+    def compact(self):
+        """
+        Drops tombstoned rows and their payload bytes.
+        """
+        self.materialize()
+        keep = np.flatnonzero(self.live[:self.count])
+        blob = bytearray()
+        offsets = np.zeros(len(self.ids) + 1, dtype=np.int64)
+        for i, row in enumerate(keep.tolist()):
+            blob.extend(self.blob[self.offsets[row]:self.offsets[row + 1]])
+            offsets[i + 1] = len(blob)
+        count = len(keep)
+        self.ids[:count] = self.ids[keep]
+        self.last_access[:count] = self.last_access[keep]
+        self.access_count[:count] = self.access_count[keep]
+        self.live[:count] = True
+        self.live[count:] = False
+        self.offsets = offsets
+        self.blob = blob
+        self.count = count
+        self.live_count = count
+
+    def live_rows(self):
+        return np.flatnonzero(self.live[:self.count])
+
+    def nbytes(self):
+        columns = [self.ids, self.offsets, self.live, self.last_access, self.access_count]
+        return {"columns": sum(column.nbytes for column in columns), "payloads": len(self.blob)}
+
+    def save(self, prefix):
+        """
+        Writes the live rows of this chunk to files starting with prefix.
+        """
+        rows = self.live_rows()
+        payloads = [self.payload_bytes(row) for row in rows.tolist()]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(payload) for payload in payloads], out=offsets[1:])
+        np.save(f"{prefix}.ids.npy", self.ids[rows])
+        np.save(f"{prefix}.offsets.npy", offsets)
+        with open(f"{prefix}.payloads.bin", 'wb') as file:
+            file.write(b''.join(payloads))
+
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        """
+        Loads a chunk written by save(). With mmap=True the ids, offsets and payload
+        columns are memory-mapped and only the small signal columns live in RAM.
+        """
+        chunk = cls(capacity=0)
+        mmap_mode = 'r' if mmap else None
+        chunk.ids = np.load(f"{prefix}.ids.npy", mmap_mode=mmap_mode)
+        chunk.offsets = np.load(f"{prefix}.offsets.npy", mmap_mode=mmap_mode)
+        payloads_path = f"{prefix}.payloads.bin"
+        if os.path.getsize(payloads_path) == 0:
+            chunk.blob = bytearray()
+        elif mmap:
+            chunk.blob = np.memmap(payloads_path, dtype=np.uint8, mode='r')
+        else:
+            chunk.blob = bytearray(np.fromfile(payloads_path, dtype=np.uint8).tobytes())
+        chunk.count = chunk.live_count = len(chunk.ids)
+        chunk.live = np.ones(chunk.count, dtype=bool)
+        chunk.last_access = np.full(chunk.count, time.time(), dtype=np.float64)
+        chunk.access_count = np.zeros(chunk.count, dtype=np.uint32)
+        chunk.read_only = mmap
+        return chunk
+
+class ColumnarMemory:
+    """
+    Dict-like memory store (id -> (vector, data)) backed by columnar chunks of
+    chunk_size consecutive ids. Only the chunk holding an id is touched on access.
+    Vectors are looked up through vector_source(ids), which reads them back from the index.
+    """
+    def __init__(self, vector_source, chunk_size=65536):
+        self.vector_source = vector_source
+        self.chunk_size = chunk_size
+        self.chunks = {}
+        self.live_count = 0
+
+    def _group(self, ids):
+        """
+        Splits ids into (chunk number, index array) groups.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        numbers = ids // self.chunk_size
+        for number in np.unique(numbers).tolist():
+            yield number, np.flatnonzero(numbers == number)
+
+    def append(self, ids, data_list):
+        payloads = [pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL) for data in data_list]
+        now = time.time()
+        for number, positions in self._group(ids):
+            chunk = self.chunks.get(number)
+            if chunk is None:
+                chunk = self.chunks[number] = MemoryChunk()
+            chunk.append(ids[positions], [payloads[i] for i in positions.tolist()], now)
+        self.live_count += len(ids)
+
+    def _find(self, memory_id):
+        chunk = self.chunks.get(int(memory_id) // self.chunk_size)
+        if chunk is None or chunk.count == 0:
+            return None, None
+        rows, found = chunk.find([memory_id])
+        if not found[0]:
+            return None, None
+        return chunk, int(rows[0])
+
+    def __getitem__(self, memory_id):
+        chunk, row = self._find(memory_id)
+        if chunk is None:
+            raise KeyError(memory_id)
+        return self.vector_source(np.asarray([memory_id], dtype=np.int64))[0], chunk.payload(row)
+
+    def __contains__(self, memory_id):
+        return self._find(memory_id)[0] is not None
+
+    def __len__(self):
+        return self.live_count
+
+    def remove(self, ids):
+        """
+        Removes the given ids and returns how many were present.
+        """
+        removed = 0
+        for number, positions in self._group(ids):
+            chunk = self.chunks.get(number)
+            if chunk is None or chunk.count == 0:
+                continue
+            rows, found = chunk.find(np.asarray(ids, dtype=np.int64)[positions])
+            rows = np.unique(rows[found])
+            chunk.remove(rows)
+            removed += len(rows)
+        self.live_count -= removed
+        return removed
+
+    def __delitem__(self, memory_id):
+        if not self.remove([memory_id]):
+            raise KeyError(memory_id)
+
+    def touch(self, ids, now=None):
+        now = now if now is not None else time.time()
+        for number, positions in self._group(ids):
+            chunk = self.chunks.get(number)
+            if chunk is None or chunk.count == 0:
+                continue
+            rows, found = chunk.find(np.asarray(ids, dtype=np.int64)[positions])
+            rows = rows[found]
+            chunk.last_access[rows] = now
+            chunk.access_count[rows] += 1
+
+    def live_ids(self):
+        parts = [self.chunks[number].ids[self.chunks[number].live_rows()] for number in sorted(self.chunks)]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def signals(self):
+        """
+        Returns (ids, last_access, access_count) arrays for every live memory.
+        """
+        ids, last_access, access_count = [self.live_ids()], [], []
+        for number in sorted(self.chunks):
+            chunk = self.chunks[number]
+            rows = chunk.live_rows()
+            last_access.append(chunk.last_access[rows])
+            access_count.append(chunk.access_count[rows])
+        if not last_access:
+            return ids[0], np.empty(0, dtype=np.float64), np.empty(0, dtype=np.uint32)
+        return ids[0], np.concatenate(last_access), np.concatenate(access_count)
+
+    def restore_signals(self, ids, last_access, access_count):
+        for number, positions in self._group(ids):
+            chunk = self.chunks.get(number)
+            if chunk is None or chunk.count == 0:
+                continue
+            rows, found = chunk.find(ids[positions])
+            chunk.last_access[rows[found]] = last_access[positions][found]
+            chunk.access_count[rows[found]] = access_count[positions][found]
+
+    def keys(self):
+        for number in sorted(self.chunks):
+            chunk = self.chunks[number]
+            yield from chunk.ids[chunk.live_rows()].tolist()
+
+    __iter__ = keys
+
+    def items(self):
+        for number in sorted(self.chunks):
+            chunk = self.chunks[number]
+            rows = chunk.live_rows()
+            vectors = self.vector_source(np.asarray(chunk.ids[rows], dtype=np.int64)) if len(rows) else []
+            for row, vector in zip(rows.tolist(), vectors):
+                yield int(chunk.ids[row]), (vector, chunk.payload(row))
+
+    def values(self):
+        for _, value in self.items():
+            yield value
+
+    def nbytes(self):
+        totals = {"columns": 0, "payloads": 0}
+        for chunk in self.chunks.values():
+            for key, value in chunk.nbytes().items():
+                totals[key] += value
+        return totals
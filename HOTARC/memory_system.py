@@ -3,22 +3,104 @@ import time
 import sqlite3
 import os
 import json
+import atexit
+import asyncio
+import contextlib
+import concurrent.futures
+import logging
+import weakref
 from cryptography.fernet import Fernet
 
+class _ReaderHandle:
+    # Owns one thread's read connection; it lives exactly as long as that thread's local storage.
+    def __init__(self, conn):
+        self.conn = conn
+
+def _close_reader(conn, reader_conns, reader_lock):
+    with reader_lock:
+        reader_conns.discard(conn)
+    conn.close()
+
 class MemorySystem:
-    def __init__(self, db_file="M1_memory.db", encryption_key=None):
+    """
+    Encrypted SQLite memory store. Long-term memory uses WAL journaling with synchronous=FULL
+    unless write-behind is enabled or synchronous is passed. store_many writes a batch in one
+    transaction, and write_behind=True buffers writes and flushes them on flush_size or
+    flush_interval, with a durable flush in close(). recall_many reads many keys at once and
+    scan_prefix/scan_range stream results over the key index in batches. With pooled=True each
+    reading thread gets its own connection (closed when the thread exits) while one dedicated
+    connection handles writes; the a* wrappers run on a thread pool, and
+    benchmark_read_scaling() reports read QPS per thread count.
+    """
+    QUERY_CHUNK_SIZE = 900  # Stays below SQLite's default limit on bound parameters
+    PARALLEL_DECRYPT_THRESHOLD = 256
+
+    def __init__(self, db_file="M1_memory.db", encryption_key=None, write_behind=False, flush_size=1000, flush_interval=1.0,
+                 pooled=False, async_workers=None, synchronous=None):
         self.db_file = db_file
-        self.conn = sqlite3.connect(self.db_file)
+        # WAL with synchronous=NORMAL can lose the last commits on power loss, which is only
+        # acceptable when writes are already buffered in memory by write-behind mode.
+        self.synchronous = (synchronous or ('NORMAL' if write_behind else 'FULL')).upper()
+        if self.synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"Unknown synchronous mode {synchronous}")
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
         self.cursor = self.conn.cursor()
+        self._configure_connection(self.conn)
         self.create_table()
         self.lock = threading.Lock()
         self.stop_thread = False
+        self.closed = False
 
         if encryption_key:
             self.fernet = Fernet(encryption_key)
         else:
             self.fernet = Fernet(Fernet.generate_key())
 
+        self.write_behind = write_behind
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending_writes = {}
+        self.flushing_writes = {}
+        self.pending_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.flush_event = threading.Event()
+        # In pooled mode self.conn is the single dedicated writer and every
+        # reading thread gets its own connection, so reads never take self.lock.
+        self.pooled = pooled
+        self.reader_local = threading.local()
+        self.reader_conns = set()
+        self.reader_lock = threading.Lock()
+        self.async_workers = async_workers
+        self.async_executor = None
+        if write_behind:
+            self.flush_thread = threading.Thread(target=self._flush_loop)
+            self.flush_thread.daemon = True
+            self.flush_thread.start()
+            atexit.register(self.close)
+        logging.basicConfig(filename='memory_system.log', level=logging.INFO)
+
+    def _configure_connection(self, conn):
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+
+    @contextlib.contextmanager
+    def _reader(self):
+        if not self.pooled:
+            with self.lock:
+                yield self.conn
+            return
+        handle = getattr(self.reader_local, 'handle', None)
+        if handle is None:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.execute('PRAGMA query_only=1')
+            handle = _ReaderHandle(conn)
+            with self.reader_lock:
+                self.reader_conns.add(conn)
+            # The thread-local is dropped when its thread ends; close the connection with it.
+            weakref.finalize(handle, _close_reader, conn, self.reader_conns, self.reader_lock)
+            self.reader_local.handle = handle
+        yield handle.conn
+
     def create_table(self):
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS memory (
@@ -30,6 +112,9 @@ class MemorySystem:
         self.conn.commit()
 
     def store_long_term(self, key, value):
+        if self.write_behind:
+            self._buffer_writes([(key, json.dumps(value))])
+            return
         encrypted_value = self.fernet.encrypt(json.dumps(value).encode('utf-8'))
         with self.lock:
             self.cursor.execute('''
@@ -38,12 +123,95 @@ class MemorySystem:
             ''', (key, encrypted_value))
             self.conn.commit()
 
-    def recall_long_term(self, key):
+    def store_many(self, items):
+        """
+        Stores many key/value pairs in a single transaction.
+        Accepts a dict or an iterable of (key, value) pairs.
+        """
+        if isinstance(items, dict):
+            items = items.items()
+        serialized = [(key, json.dumps(value)) for key, value in items]
+        if self.write_behind:
+            self._buffer_writes(serialized)
+        else:
+            self._write_batch(serialized)
+
+    def _buffer_writes(self, serialized):
+        with self.pending_lock:
+            self.pending_writes.update(serialized)
+            full = len(self.pending_writes) >= self.flush_size
+        if full:
+            self.flush()
+
+    def _write_batch(self, serialized):
+        rows = [(key, self.fernet.encrypt(value.encode('utf-8'))) for key, value in serialized]
+        if not rows:
+            return
         with self.lock:
-            self.cursor.execute('''
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO memory (key, value)
+                VALUES (?, ?)
+            ''', rows)
+            self.conn.commit()
+
+    def flush(self):
+        """
+        Writes all buffered writes in one transaction.
+        """
+        with self.flush_lock:
+            with self.pending_lock:
+                self.flushing_writes = self.pending_writes
+                self.pending_writes = {}
+            try:
+                self._write_batch(list(self.flushing_writes.items()))
+            except Exception:
+                with self.pending_lock:
+                    self.flushing_writes.update(self.pending_writes)
+                    self.pending_writes = self.flushing_writes
+                    self.flushing_writes = {}
+                raise
+            with self.pending_lock:
+                self.flushing_writes = {}
+
+    def _flush_loop(self):
+        while not self.flush_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Error flushing buffered memory writes: {e}")
+
+    def close(self):
+        """
+        Flushes buffered writes, checkpoints the WAL and closes the database.
+        """
+        if self.closed:
+            return
+        self.flush_event.set()
+        if self.write_behind and self.flush_thread.is_alive():
+            self.flush_thread.join()
+        self.flush()
+        if self.async_executor is not None:
+            self.async_executor.shutdown(wait=True)
+        with self.reader_lock:
+            for conn in self.reader_conns:
+                conn.close()
+            self.reader_conns.clear()
+        with self.lock:
+            self.conn.execute('PRAGMA wal_checkpoint(FULL)')
+            self.conn.close()
+            self.closed = True
+        if self.write_behind:
+            atexit.unregister(self.close)
+
+    def recall_long_term(self, key):
+        with self.pending_lock:
+            pending = self.pending_writes.get(key, self.flushing_writes.get(key))
+        if pending is not None:
+            return json.loads(pending)
+        with self._reader() as conn:
+            result = conn.execute('''
                 SELECT value FROM memory WHERE key = ?
-            ''', (key,))
-            result = self.cursor.fetchone()
+            ''', (key,)).fetchone()
             if result:
                 encrypted_value = result[0]
                 decrypted_value = self.fernet.decrypt(encrypted_value).decode('utf-8')
@@ -51,6 +219,130 @@ class MemorySystem:
             else:
                 return None
 
+    def recall_many(self, keys, max_workers=None):
+        """
+        Recalls many keys with one query per chunk of keys and decrypts the results in parallel.
+        Returns a dict mapping every requested key to its value, or None if it is not stored.
+        """
+        keys = list(dict.fromkeys(keys))
+        results = {}
+        with self.pending_lock:
+            for key in keys:
+                pending = self.pending_writes.get(key, self.flushing_writes.get(key))
+                if pending is not None:
+                    results[key] = json.loads(pending)
+        missing = [key for key in keys if key not in results]
+        rows = []
+        with self._reader() as conn:
+            for start in range(0, len(missing), self.QUERY_CHUNK_SIZE):
+                chunk = missing[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows.extend(conn.execute(f'''
+                    SELECT key, value FROM memory WHERE key IN ({placeholders})
+                ''', chunk).fetchall())
+        results.update(zip([row[0] for row in rows], self._decrypt_values([row[1] for row in rows], max_workers)))
+        return {key: results.get(key) for key in keys}
+
+    def scan_prefix(self, prefix, batch_size=500):
+        """
+        Streams (key, value) pairs for all keys starting with prefix, in key order.
+        """
+        end = None
+        stripped = prefix.rstrip(chr(0x10FFFF))
+        if stripped:
+            end = stripped[:-1] + chr(ord(stripped[-1]) + 1)
+        return self.scan_range(prefix or None, end, batch_size)
+
+    def scan_range(self, start=None, end=None, batch_size=500):
+        """
+        Streams (key, value) pairs for keys in [start, end), in key order.
+        Rows are fetched in batches over the key index so the result set is never fully materialized.
+        """
+        self.flush()
+        last_key = None
+        while True:
+            conditions = []
+            params = []
+            if last_key is not None:
+                conditions.append('key > ?')
+                params.append(last_key)
+            elif start is not None:
+                conditions.append('key >= ?')
+                params.append(start)
+            if end is not None:
+                conditions.append('key < ?')
+                params.append(end)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            with self._reader() as conn:
+                rows = conn.execute(f'''
+                    SELECT key, value FROM memory {where} ORDER BY key LIMIT ?
+                ''', params + [batch_size]).fetchall()
+            if not rows:
+                return
+            values = self._decrypt_values([row[1] for row in rows])
+            for (key, _), value in zip(rows, values):
+                yield key, value
+            if len(rows) < batch_size:
+                return
+            last_key = rows[-1][0]
+
+    def _run_async(self, func, *args):
+        if self.async_executor is None:
+            with self.reader_lock:
+                if self.async_executor is None:
+                    self.async_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.async_workers)
+        return asyncio.get_running_loop().run_in_executor(self.async_executor, func, *args)
+
+    async def astore_long_term(self, key, value):
+        return await self._run_async(self.store_long_term, key, value)
+
+    async def astore_many(self, items):
+        return await self._run_async(self.store_many, items)
+
+    async def arecall_long_term(self, key):
+        return await self._run_async(self.recall_long_term, key)
+
+    async def arecall_many(self, keys):
+        return await self._run_async(self.recall_many, keys)
+
+    def benchmark_read_scaling(self, thread_counts=(1, 2, 4, 8), duration=2.0, num_keys=10000):
+        """
+        Measures recall_long_term throughput (queries per second) for each thread count
+        against temporary benchmark keys, which are removed afterwards.
+        """
+        keys = [f"__benchmark__:{i}" for i in range(num_keys)]
+        self.store_many((key, {"value": i}) for i, key in enumerate(keys))
+        self.flush()
+        results = {}
+        try:
+            for thread_count in thread_counts:
+                counts = [0] * thread_count
+                deadline = time.perf_counter() + duration
+                def reader(slot):
+                    i = slot
+                    while time.perf_counter() < deadline:
+                        self.recall_long_term(keys[i % num_keys])
+                        i += thread_count
+                        counts[slot] += 1
+                with concurrent.futures.ThreadPoolExecutor(max_workers=thread_count) as executor:
+                    list(executor.map(reader, range(thread_count)))
+                results[thread_count] = sum(counts) / duration
+                logging.info(f"Read benchmark: {thread_count} threads, {results[thread_count]:.0f} reads/s (pooled={self.pooled})")
+        finally:
+            with self.lock:
+                self.conn.executemany('DELETE FROM memory WHERE key = ?', [(key,) for key in keys])
+                self.conn.commit()
+        return results
+
+    def _decrypt_value(self, encrypted_value):
+        return json.loads(self.fernet.decrypt(encrypted_value).decode('utf-8'))
+
+    def _decrypt_values(self, encrypted_values, max_workers=None):
+        if len(encrypted_values) < self.PARALLEL_DECRYPT_THRESHOLD:
+            return [self._decrypt_value(value) for value in encrypted_values]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self._decrypt_value, encrypted_values, chunksize=64))
+
     def store_short_term(self, key, value):
         self.short_term_memory[key] = value
 
@@ -61,7 +353,7 @@ class MemorySystem:
         def save():
             while not self.stop_thread:
                 time.sleep(interval)
-                self.conn.commit()
+                self.flush()
         self.save_thread = threading.Thread(target=save)
         self.save_thread.daemon = True
         self.save_thread.start()
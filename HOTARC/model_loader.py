@@ -0,0 +1,80 @@
+import time
+import threading
+import logging
+
+class LazyModel:
+    """
+    Defers construction of a model until it is first used.
+    Calling the wrapper or reading an attribute materializes the model once.
+    """
+    def __init__(self, loader, name=None):
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+        self.name = name or getattr(loader, '__name__', 'model')
+        self.load_time = None
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def get(self):
+        """
+        Returns the underlying model, loading it on the first call.
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = self._loader()
+                    self.load_time = time.perf_counter() - start
+                    logging.info(f"Loaded model {self.name} in {self.load_time:.3f}s")
+        return self._model
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr in ('_loader', '_model', '_lock'):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+class StartupProfiler:
+    """
+    Records how long each component takes to construct, together with the
+    load state of any lazily loaded models it owns.
+    """
+    def __init__(self):
+        self.timings = {}
+        self.components = {}
+
+    def build(self, name, factory):
+        """
+        Constructs a component with the given factory and records its construction time.
+        """
+        start = time.perf_counter()
+        component = factory()
+        self.timings[name] = time.perf_counter() - start
+        self.components[name] = component
+        return component
+
+    def report(self):
+        """
+        Returns a per-component report of construction time and lazy model load times.
+        """
+        report = {}
+        for name, seconds in self.timings.items():
+            models = {}
+            for attr, value in vars(self.components[name]).items():
+                if isinstance(value, LazyModel):
+                    models[attr] = {"loaded": value.loaded, "load_time": value.load_time}
+            report[name] = {"init_time": seconds, "models": models}
+        return report
+
+    def log_report(self):
+        report = self.report()
+        total = sum(entry["init_time"] for entry in report.values())
+        for name, entry in sorted(report.items(), key=lambda item: item[1]["init_time"], reverse=True):
+            logging.info(f"Startup: {name} constructed in {entry['init_time']:.3f}s, models: {entry['models']}")
+        logging.info(f"Startup: total construction time {total:.3f}s")
+        return report
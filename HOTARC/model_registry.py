@@ -0,0 +1,145 @@
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from transformers import pipeline
+
+TASK_ALIASES = {
+    'sentiment-analysis': 'text-classification',
+}
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models keyed by (task, model name, device, dtype).
+    Instances are shared and reference counted; unreferenced models are evicted
+    in least-recently-used order once the RAM budget is exceeded.
+    """
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "load_time": 0.0}
+        logging.basicConfig(filename='model_registry.log', level=logging.INFO)
+
+    def _make_key(self, task, model_name, device=None, dtype=None):
+        return (TASK_ALIASES.get(task, task), model_name, str(device) if device is not None else None, str(dtype) if dtype is not None else None)
+
+    def _default_loader(self, task, model_name, device, dtype):
+        kwargs = {"model": model_name}
+        if device is not None:
+            kwargs["device"] = device
+        if dtype is not None:
+            kwargs["torch_dtype"] = dtype
+        return pipeline(task, **kwargs)
+
+    def acquire(self, task, model_name, device=None, dtype=None, loader=None):
+        """
+        Returns a shared model instance, loading it if it is not cached yet.
+        Every acquire must be matched by a release once the caller is done with the model.
+        """
+        key = self._make_key(task, model_name, device, dtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["refcount"] += 1
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry["model"]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["refcount"] += 1
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry["model"]
+            start = time.perf_counter()
+            if loader is not None:
+                model = loader()
+            else:
+                model = self._default_loader(task, model_name, device, dtype)
+            load_time = time.perf_counter() - start
+            size = self._estimate_size(model)
+            with self._lock:
+                self._entries[key] = {"model": model, "refcount": 1, "size": size, "load_time": load_time}
+                self.stats["misses"] += 1
+                self.stats["load_time"] += load_time
+                self._evict()
+            logging.info(f"Loaded model {key} in {load_time:.3f}s ({size} bytes)")
+            return model
+
+    def release(self, task, model_name, device=None, dtype=None):
+        """
+        Drops one reference to a model. Unreferenced models stay cached until evicted.
+        """
+        key = self._make_key(task, model_name, device, dtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                logging.warning(f"Release of unknown model {key}")
+                return
+            entry["refcount"] = max(entry["refcount"] - 1, 0)
+            self._evict()
+
+    def set_budget(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry["size"] for entry in self._entries.values())
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        total = sum(entry["size"] for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry["refcount"] > 0:
+                continue
+            total -= entry["size"]
+            del self._entries[key]
+            self.stats["evictions"] += 1
+            logging.info(f"Evicted model {key} ({entry['size']} bytes)")
+
+    def _estimate_size(self, model):
+        if isinstance(model, (tuple, list)):
+            return sum(self._estimate_size(item) for item in model)
+        module = getattr(model, 'model', model)
+        try:
+            size = sum(p.numel() * p.element_size() for p in module.parameters())
+            size += sum(b.numel() * b.element_size() for b in module.buffers())
+            return size
+        except Exception:
+            return 0
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["models"] = {key: {"refcount": entry["refcount"], "size": entry["size"], "load_time": entry["load_time"]}
+                               for key, entry in self._entries.items()}
+            stats["total_bytes"] = sum(entry["size"] for entry in self._entries.values())
+            return stats
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """
+    Returns the process-wide registry. The RAM budget defaults to HOTARC_MODEL_RAM_BUDGET (bytes) if set.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            budget = os.environ.get('HOTARC_MODEL_RAM_BUDGET')
+            _registry = ModelRegistry(int(budget) if budget else None)
+        return _registry
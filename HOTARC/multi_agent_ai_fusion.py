@@ -1,7 +1,7 @@
 import logging
 import concurrent.futures
 import numpy as np
-from transformers import pipeline
+from model_registry import get_registry
 
 class MultiAgentAIFusion:
     def __init__(self):
@@ -12,7 +12,7 @@ class MultiAgentAIFusion:
 
     def add_model(self, model_name):
         try:
-            model = pipeline('text-classification', model=model_name)
+            model = get_registry().acquire('text-classification', model_name)
             self.models.append(model)
             self.model_performance[model_name] = []
             logging.info(f"Added model: {model_name}")
@@ -6,28 +6,53 @@ from pgmpy.models import BayesianNetwork
 from pgmpy.inference import VariableElimination
 from conceptnet5.client import ConceptNet
 from itertools import product
+from collections import OrderedDict
+from scenario_search import ScenarioSearch
+from knowledge_snapshot import KnowledgeSnapshot
+from knowledge_graph_index import KnowledgeGraphIndex
 
 class ReasoningCore:
-    def __init__(self):
+    EVIDENCE_VARIABLES = ('action', 'state')
+    KNOWLEDGE_SEEDS = ('/c/en/knowledge',)
+
+    def __init__(self, outcome_cache_size=1024, snapshot_path=None, offline=False):
         self.decision_graph = BayesianNetwork()
+        self.inference = None
+        self.graph_signature = None
+        self.graph_version = 0
+        self.outcome_cache = OrderedDict()
+        self.outcome_cache_size = outcome_cache_size
+        self.cache_stats = {"hits": 0, "misses": 0, "compilations": 0}
         self.knowledge_graph = nx.Graph()
-        self.conceptnet_client = ConceptNet()
+        self.graph_index = None
+        self.graph_index_size = None
+        # With a snapshot the client is only created if a seed still has to be fetched.
+        self.snapshot = KnowledgeSnapshot(snapshot_path) if snapshot_path else None
+        self.offline = offline
+        self.conceptnet_client = None if self.snapshot else ConceptNet()
         logging.basicConfig(filename='reasoning_core.log', level=logging.INFO)
 
     def initialize(self):
         self._build_knowledge_graph()
+        self.graph_index = None
         logging.info("Reasoning core initialized.")
 
-    def plan(self):
+    def plan(self, search=None):
         try:
-            scenarios = self._generate_scenarios()
-            best_scenario = self._evaluate_scenarios(scenarios)
+            if search is not None:
+                best_scenario = self.top_scenarios(1, search=search)[0][0]
+            else:
+                scenarios = self._generate_scenarios()
+                best_scenario = self._evaluate_scenarios(scenarios)
             self._execute_scenario(best_scenario)
             logging.info(f"Executed scenario: {best_scenario}")
         except Exception as e:
             logging.error(f"Error in planning: {e}")
 
     def _build_knowledge_graph(self):
+        if self.snapshot is not None:
+            self._build_knowledge_graph_from_snapshot()
+            return
         # Integrate ConceptNet to build a knowledge graph
         edges = self.conceptnet_client.edges(start='/c/en/knowledge', limit=100)
         for edge in edges:
@@ -37,6 +62,51 @@ class ReasoningCore:
             self.knowledge_graph.add_edge(start, end, weight=weight)
         logging.info("Knowledge graph built using ConceptNet.")
 
+    def _build_knowledge_graph_from_snapshot(self):
+        if self.snapshot.exists():
+            self.snapshot.load()
+        if not self.offline and self.snapshot.unfetched(self.KNOWLEDGE_SEEDS):
+            if self.conceptnet_client is None:
+                self.conceptnet_client = ConceptNet()
+            self.snapshot.refresh(self.conceptnet_client, self.KNOWLEDGE_SEEDS, limit=100)
+        self.knowledge_graph = self.snapshot.to_networkx()
+        logging.info(f"Knowledge graph built from snapshot {self.snapshot.path}: {self.snapshot.report()}")
+
+    def import_knowledge_dump(self, dump_path, language='en', relations=None):
+        """
+        Imports a ConceptNet CSV/JSONL dump into the local snapshot and rebuilds the knowledge graph from it.
+        """
+        if self.snapshot is None:
+            self.snapshot = KnowledgeSnapshot()
+        report = self.snapshot.import_dump(dump_path, language=language, relations=relations)
+        self.knowledge_graph = self.snapshot.to_networkx()
+        self.graph_index = None
+        return report
+
+    def knowledge_index(self):
+        """
+        Returns the CSR query index over the knowledge graph, refreezing it if the graph has changed.
+        """
+        size = (self.knowledge_graph.number_of_nodes(), self.knowledge_graph.number_of_edges())
+        if self.graph_index is None or self.graph_index_size != size:
+            self.graph_index = KnowledgeGraphIndex.from_networkx(self.knowledge_graph)
+            self.graph_index_size = size
+        return self.graph_index
+
+    def related_concepts(self, concepts, k=2):
+        """
+        Concepts within k hops of each given concept, with their hop distance.
+        """
+        index = self.knowledge_index()
+        known = [concept for concept in concepts if concept in index.label_index]
+        return index.k_hop(known, k=k)
+
+    def rank_related_concepts(self, concept_sets, top_k=10):
+        """
+        Ranks concepts by personalized PageRank from each set of seed concepts.
+        """
+        return self.knowledge_index().top_related(concept_sets, top_k=top_k)
+
     def _generate_scenarios(self):
         # Generate multiple scenarios for evaluation
         actions = ['action1', 'action2', 'action3']
@@ -49,8 +119,9 @@ class ReasoningCore:
         # Evaluate scenarios using Bayesian Networks and causal AI
         best_score = -np.inf
         best_scenario = None
+        outcomes = self._predict_outcomes(scenarios)
         for scenario in scenarios:
-            score = self._predict_outcome(scenario)
+            score = outcomes[tuple(scenario)]
             if score > best_score:
                 best_score = score
                 best_scenario = scenario
@@ -59,15 +130,113 @@ class ReasoningCore:
 
     def _predict_outcome(self, scenario):
         # Predict the outcome of a scenario using Bayesian Networks
+        return self._predict_outcomes([scenario])[tuple(scenario)]
+
+    def _predict_outcomes(self, scenarios):
+        """
+        Predicts the MAP outcome of every scenario. Distinct evidence sets are looked up in an LRU cache;
+        all misses are answered from a single joint query over outcome, action and state.
+        """
+        distinct = list(dict.fromkeys(tuple(scenario) for scenario in scenarios))
         try:
-            inference = VariableElimination(self.decision_graph)
-            evidence = {'action': scenario[0], 'state': scenario[1]}
-            prediction = inference.map_query(variables=['outcome'], evidence=evidence)
-            score = prediction.get('outcome', 0)
-            return score
+            inference = self._compiled_inference()
         except Exception as e:
             logging.error(f"Error in predicting outcome: {e}")
-            return 0
+            return {scenario: 0 for scenario in distinct}
+        results = {}
+        missing = []
+        for scenario in distinct:
+            if scenario in self.outcome_cache:
+                self.outcome_cache.move_to_end(scenario)
+                results[scenario] = self.outcome_cache[scenario]
+                self.cache_stats["hits"] += 1
+            else:
+                missing.append(scenario)
+        if missing:
+            self.cache_stats["misses"] += len(missing)
+            try:
+                predictions = self._batched_map_query(inference, missing)
+            except Exception as e:
+                logging.error(f"Error in predicting outcome: {e}")
+                predictions = {scenario: 0 for scenario in missing}
+            for scenario, score in predictions.items():
+                results[scenario] = score
+                self.outcome_cache[scenario] = score
+            while len(self.outcome_cache) > self.outcome_cache_size:
+                self.outcome_cache.popitem(last=False)
+        logging.info(f"Predicted {len(results)} distinct scenarios ({len(missing)} computed, "
+                     f"graph version {self.graph_version}).")
+        return results
+
+    def _batched_map_query(self, inference, scenarios):
+        # MAP of outcome given (action, state) is the argmax of the joint over outcome at that (action, state).
+        variables = list(self.EVIDENCE_VARIABLES) + ['outcome']
+        joint = inference.query(variables=variables, joint=True, show_progress=False)
+        table = np.moveaxis(joint.values, [joint.variables.index(v) for v in variables], range(len(variables)))
+        best = np.argmax(table, axis=-1)
+        positions = {v: {name: i for i, name in enumerate(joint.state_names[v])} for v in variables}
+        outcome_names = joint.state_names['outcome']
+        predictions = {}
+        for scenario in scenarios:
+            try:
+                index = tuple(positions[v][value] for v, value in zip(self.EVIDENCE_VARIABLES, scenario))
+            except KeyError as e:
+                logging.error(f"Error in predicting outcome: unknown state {e} in scenario {scenario}")
+                predictions[scenario] = 0
+                continue
+            predictions[scenario] = outcome_names[best[index]]
+        return predictions
+
+    def outcome_table(self, state_variables=('state',)):
+        """
+        Precomputes the MAP outcome for every action and state combination as a NumPy array
+        (one axis for the action and one per state variable) from a single joint query.
+        Returns the table and the state names along each axis.
+        """
+        variables = ['action'] + list(state_variables) + ['outcome']
+        joint = self._compiled_inference().query(variables=variables, joint=True, show_progress=False)
+        table = np.moveaxis(joint.values, [joint.variables.index(v) for v in variables], range(len(variables)))
+        outcomes = np.asarray(joint.state_names['outcome'], dtype=np.float64)
+        labels = [list(joint.state_names[v]) for v in variables[:-1]]
+        return outcomes[np.argmax(table, axis=-1)], labels
+
+    def top_scenarios(self, k=1, search='branch_and_bound', state_variables=('state',), beam_width=64, factors=()):
+        """
+        Returns the k best (scenario, score) pairs scored from the precomputed outcome table,
+        without enumerating scenarios in Python. factors adds further (axes, array) score terms,
+        e.g. per-action costs. search is 'exhaustive', 'beam' or 'branch_and_bound'.
+        """
+        table, labels = self.outcome_table(state_variables)
+        searcher = ScenarioSearch([(tuple(range(table.ndim)), table)] + list(factors), labels,
+                                  ['action'] + list(state_variables))
+        results = searcher.top_k(k, method=search, beam_width=beam_width)
+        logging.info(f"Top {k} scenarios by {search}: {results}")
+        return results
+
+    def _compiled_inference(self):
+        """
+        Returns the inference engine for the current network, rebuilding it and clearing the
+        outcome cache whenever the network structure or CPDs have changed.
+        """
+        signature = self._graph_signature()
+        if self.inference is None or signature != self.graph_signature:
+            self.inference = VariableElimination(self.decision_graph)
+            self.graph_signature = signature
+            self.graph_version += 1
+            self.outcome_cache.clear()
+            self.cache_stats["compilations"] += 1
+            logging.info(f"Compiled inference engine for decision graph version {self.graph_version}.")
+        return self.inference
+
+    def _graph_signature(self):
+        cpds = tuple((cpd.variable, id(cpd), cpd.values.tobytes()) for cpd in self.decision_graph.get_cpds())
+        return tuple(sorted(self.decision_graph.edges())), cpds
+
+    def invalidate_inference(self):
+        """
+        Forces the inference engine to be rebuilt and the outcome cache to be cleared on the next query.
+        """
+        self.inference = None
 
     def _execute_scenario(self, scenario):
         # Execute the selected scenario
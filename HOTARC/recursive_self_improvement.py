@@ -2,11 +2,14 @@ import logging
 import time
 import subprocess
 import os
-from transformers import pipeline
+from model_loader import LazyModel
+from model_registry import get_registry
 
 class RecursiveSelfImprovement:
-    def __init__(self):
-        self.code_evaluator = pipeline('text-generation', model='openai/codex')
+    def __init__(self, lazy=False):
+        self.code_evaluator = LazyModel(lambda: get_registry().acquire('text-generation', 'openai/codex'), name="code_evaluator")
+        if not lazy:
+            self.code_evaluator.get()
         logging.basicConfig(filename='recursive_self_improvement.log', level=logging.INFO)
 
     def analyze_and_improve(self):
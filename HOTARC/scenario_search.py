@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import logging
+import numpy as np
+
+class ScenarioSearch:
+    """
+    Scores scenarios (one value per decision variable: the action, then each state variable)
+    from precomputed NumPy outcome tables. The score of a scenario is the sum of its factors,
+    each an array over a subset of the variables, so the full action x state product never has
+    to be materialized. Exhaustive scoring works on blocks of flat indices; beam search and
+    branch-and-bound only expand the partial scenarios they need.
+    """
+    def __init__(self, factors, labels, variables=None, block_size=65536):
+        self.labels = [list(values) for values in labels]
+        self.shape = tuple(len(values) for values in self.labels)
+        self.variables = list(variables) if variables else [f"var{i}" for i in range(len(self.shape))]
+        self.factors = []
+        for axes, table in factors:
+            axes = tuple(axes)
+            table = np.asarray(table, dtype=np.float64)
+            if table.shape != tuple(self.shape[axis] for axis in axes):
+                raise ValueError(f"Factor over axes {axes} has shape {table.shape}, expected "
+                                 f"{tuple(self.shape[axis] for axis in axes)}")
+            # Store factor axes in increasing order so prefix bounds can be read off directly.
+            order = np.argsort(axes)
+            self.factors.append((tuple(axes[i] for i in order), np.transpose(table, order)))
+        self.block_size = block_size
+        self._bounds = {}
+        logging.basicConfig(filename='scenario_search.log', level=logging.INFO)
+
+    @classmethod
+    def from_table(cls, table, labels, variables=None, block_size=65536):
+        """
+        Builds a search over a single dense outcome table with one axis per variable.
+        """
+        table = np.asarray(table)
+        return cls([(tuple(range(table.ndim)), table)], labels, variables, block_size)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape, dtype=np.int64))
+
+    def scenario(self, index):
+        return tuple(self.labels[axis][i] for axis, i in enumerate(index))
+
+    def score(self, assignments):
+        """
+        Scores an (n, num_variables) array of label indices in one vectorized pass.
+        """
+        assignments = np.asarray(assignments)
+        scores = np.zeros(len(assignments))
+        for axes, table in self.factors:
+            scores += table[tuple(assignments[:, axis] for axis in axes)]
+        return scores
+
+    def iter_blocks(self):
+        """
+        Yields (assignments, scores) for consecutive blocks of the scenario space.
+        """
+        for start in range(0, self.size, self.block_size):
+            flat = np.arange(start, min(start + self.block_size, self.size))
+            assignments = np.stack(np.unravel_index(flat, self.shape), axis=1)
+            yield assignments, self.score(assignments)
+
+    def top_k(self, k=1, method='branch_and_bound', beam_width=64):
+        """
+        Returns the k best scenarios as (scenario, score) pairs, best first.
+        'exhaustive' scans every scenario in blocks, 'beam' keeps the beam_width most promising
+        partial scenarios per variable (fast, approximate), and 'branch_and_bound' expands
+        partial scenarios in order of their upper bound (exact).
+        """
+        if method == 'exhaustive':
+            assignments, scores, expanded = self._top_k_exhaustive(k)
+        elif method == 'beam':
+            assignments, scores, expanded = self._top_k_beam(k, beam_width)
+        elif method == 'branch_and_bound':
+            assignments, scores, expanded = self._top_k_branch_and_bound(k)
+        else:
+            raise ValueError(f"Unknown search method: {method}")
+        logging.info(f"Top-{k} {method} search over {self.size} scenarios scored {expanded} candidates.")
+        return [(self.scenario(index), float(score)) for index, score in zip(assignments, scores)]
+
+    def _top_k_exhaustive(self, k):
+        best_assignments = np.empty((0, len(self.shape)), dtype=np.int64)
+        best_scores = np.empty(0)
+        for assignments, scores in self.iter_blocks():
+            best_assignments = np.concatenate([best_assignments, assignments])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_assignments, best_scores = best_assignments[keep], best_scores[keep]
+        order = np.argsort(-best_scores, kind='stable')
+        return best_assignments[order], best_scores[order], self.size
+
+    def _prefix_bound(self, factor, depth):
+        # Max of the factor over its unassigned axes (>= depth), indexed by its assigned axes.
+        key = (factor, depth)
+        if key not in self._bounds:
+            axes, table = self.factors[factor]
+            free = tuple(i for i, axis in enumerate(axes) if axis >= depth)
+            self._bounds[key] = table.max(axis=free) if free else table
+        return self._bounds[key]
+
+    def _bound(self, prefixes):
+        """
+        Upper bound on the score of any completion of each (n, depth) prefix.
+        """
+        depth = prefixes.shape[1]
+        bounds = np.zeros(len(prefixes))
+        for factor, (axes, _) in enumerate(self.factors):
+            assigned = [axis for axis in axes if axis < depth]
+            bounds += self._prefix_bound(factor, depth)[tuple(prefixes[:, axis] for axis in assigned)]
+        return bounds
+
+    def _expand(self, prefixes):
+        depth = prefixes.shape[1]
+        card = self.shape[depth]
+        children = np.empty((len(prefixes) * card, depth + 1), dtype=np.int64)
+        children[:, :depth] = np.repeat(prefixes, card, axis=0)
+        children[:, depth] = np.tile(np.arange(card), len(prefixes))
+        return children
+
+    def _top_k_beam(self, k, beam_width):
+        prefixes = np.empty((1, 0), dtype=np.int64)
+        expanded = 0
+        for _ in self.shape:
+            prefixes = self._expand(prefixes)
+            bounds = self._bound(prefixes)
+            expanded += len(prefixes)
+            width = max(beam_width, k)
+            if len(prefixes) > width:
+                keep = np.argpartition(-bounds, width - 1)[:width]
+                prefixes, bounds = prefixes[keep], bounds[keep]
+        order = np.argsort(-bounds, kind='stable')[:k]
+        return prefixes[order], bounds[order], expanded
+
+    def _top_k_branch_and_bound(self, k):
+        # Best-first search: bounds are admissible, so complete scenarios come off the heap in score order.
+        counter = itertools.count()
+        heap = [(-self._bound(np.empty((1, 0), dtype=np.int64))[0], next(counter), ())]
+        results = []
+        scores = []
+        expanded = 0
+        while heap and len(results) < k:
+            negative_bound, _, prefix = heapq.heappop(heap)
+            if len(prefix) == len(self.shape):
+                results.append(prefix)
+                scores.append(-negative_bound)
+                continue
+            children = self._expand(np.asarray([prefix], dtype=np.int64).reshape(1, -1))
+            bounds = self._bound(children)
+            expanded += len(children)
+            for child, bound in zip(children.tolist(), bounds.tolist()):
+                heapq.heappush(heap, (-bound, next(counter), tuple(child)))
+        return np.asarray(results, dtype=np.int64).reshape(-1, len(self.shape)), np.asarray(scores), expanded
+
+# Example usage of ScenarioSearch
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    actions = [f"action{i}" for i in range(300)]
+    weather = ['clear', 'rain', 'storm']
+    load = ['low', 'medium', 'high']
+    search = ScenarioSearch([((0,), rng.random(len(actions))),
+                             ((0, 1), rng.random((len(actions), len(weather)))),
+                             ((0, 2), rng.random((len(actions), len(load))))],
+                            [actions, weather, load], ['action', 'weather', 'load'])
+    for method in ('exhaustive', 'beam', 'branch_and_bound'):
+        print(method, search.top_k(3, method=method))
@@ -0,0 +1,199 @@
+import time
+import logging
+import threading
+import concurrent.futures
+
+# A timeout does not stop a stage: its worker keeps running, and the interpreter waits for it at
+# exit. Futures of timed-out stages are kept here, across schedulers, so the same work is not
+# started again while its previous run is still alive.
+_stragglers = {}
+_stragglers_lock = threading.Lock()
+
+def call_method(obj, method, *args, **kwargs):
+    """
+    Looks the method up when the stage runs, so a missing method fails that stage only.
+    """
+    return getattr(obj, method)(*args, **kwargs)
+
+class Stage:
+    def __init__(self, name, func, deps=(), timeout=None, args=(), kwargs=None, key=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.args = args
+        self.kwargs = kwargs or {}
+        # Identifies the work across runs, for refusing to restart a stage that is still running.
+        self.key = key if key is not None else (name, func)
+
+class StageScheduler:
+    """
+    Runs stages as a dependency graph. Stages whose dependencies have completed
+    run concurrently on a thread or process pool; a failing or timed-out stage only
+    skips the stages that depend on it. A timeout only stops waiting for a stage, it does
+    not stop the stage itself; until that run finishes, later runs skip the stage.
+    """
+    def __init__(self, max_workers=None, use_processes=False, default_timeout=None):
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.default_timeout = default_timeout
+        self.stages = {}
+        logging.basicConfig(filename='stage_scheduler.log', level=logging.INFO)
+
+    def add_stage(self, name, func, deps=(), timeout=None, args=(), kwargs=None, key=None):
+        if name in self.stages:
+            raise ValueError(f"Stage {name} is already defined")
+        self.stages[name] = Stage(name, func, deps, timeout, args, kwargs, key)
+
+    def add_method_stage(self, name, obj, method, deps=(), timeout=None, args=(), kwargs=None):
+        self.add_stage(name, call_method, deps, timeout, (obj, method) + tuple(args), kwargs,
+                       key=(name, id(obj), method))
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+        visited = {}
+        def visit(name):
+            state = visited.get(name)
+            if state == 'done':
+                return
+            if state == 'visiting':
+                raise ValueError(f"Dependency cycle detected at stage {name}")
+            visited[name] = 'visiting'
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visited[name] = 'done'
+        for name in self.stages:
+            visit(name)
+
+    def run(self):
+        """
+        Executes all stages and returns a report with the status, wall time and
+        error of each stage, the total wall time and the critical path.
+        """
+        self._validate()
+        results = {name: {"status": "pending", "start": None, "end": None, "duration": None, "result": None, "error": None}
+                   for name in self.stages}
+        pool_cls = concurrent.futures.ProcessPoolExecutor if self.use_processes else concurrent.futures.ThreadPoolExecutor
+        run_start = time.perf_counter()
+        executor = pool_cls(max_workers=self.max_workers)
+        running = {}
+        self._skip_still_running(results)
+        try:
+            while True:
+                self._skip_blocked(results)
+                for name, stage in self.stages.items():
+                    if results[name]["status"] == "pending" and all(results[dep]["status"] == "completed" for dep in stage.deps):
+                        results[name]["status"] = "running"
+                        results[name]["start"] = time.perf_counter() - run_start
+                        running[executor.submit(stage.func, *stage.args, **stage.kwargs)] = name
+                if not running:
+                    break
+                done, _ = concurrent.futures.wait(running, timeout=self._next_deadline(running, results, run_start),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                now = time.perf_counter() - run_start
+                for future in done:
+                    name = running.pop(future)
+                    entry = results[name]
+                    entry["end"] = now
+                    entry["duration"] = now - entry["start"]
+                    try:
+                        entry["result"] = future.result()
+                        entry["status"] = "completed"
+                    except Exception as e:
+                        entry["status"] = "failed"
+                        entry["error"] = repr(e)
+                        logging.error(f"Stage {name} failed: {e}")
+                for future, name in list(running.items()):
+                    entry = results[name]
+                    timeout = self._timeout(name)
+                    if timeout is not None and now - entry["start"] >= timeout:
+                        running.pop(future)
+                        if not future.cancel():
+                            with _stragglers_lock:
+                                _stragglers[self.stages[name].key] = future
+                        entry["status"] = "timeout"
+                        entry["end"] = now
+                        entry["duration"] = now - entry["start"]
+                        entry["error"] = f"Timed out after {timeout}s"
+                        logging.error(f"Stage {name} timed out after {timeout}s")
+        finally:
+            # Timed-out stages cannot be interrupted; do not block on them here.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        total = time.perf_counter() - run_start
+        critical_path, critical_time = self._critical_path(results)
+        report = {"stages": results, "total_time": total, "critical_path": critical_path, "critical_path_time": critical_time}
+        self._log_report(report)
+        return report
+
+    def _timeout(self, name):
+        timeout = self.stages[name].timeout
+        return timeout if timeout is not None else self.default_timeout
+
+    def _next_deadline(self, running, results, run_start):
+        now = time.perf_counter() - run_start
+        remaining = [self._timeout(name) - (now - results[name]["start"])
+                     for name in running.values() if self._timeout(name) is not None]
+        return max(min(remaining), 0) if remaining else None
+
+    def _skip_still_running(self, results):
+        with _stragglers_lock:
+            for key, future in list(_stragglers.items()):
+                if future.done():
+                    del _stragglers[key]
+            for name, stage in self.stages.items():
+                if stage.key in _stragglers:
+                    results[name]["status"] = "skipped"
+                    results[name]["error"] = f"Skipped because a previous run of {name} is still running"
+                    logging.warning(f"Stage {name} not started: its previous run timed out and is still running")
+
+    def _skip_blocked(self, results):
+        changed = True
+        while changed:
+            changed = False
+            for name, stage in self.stages.items():
+                if results[name]["status"] != "pending":
+                    continue
+                blocked = [dep for dep in stage.deps if results[dep]["status"] in ("failed", "timeout", "skipped")]
+                if blocked:
+                    results[name]["status"] = "skipped"
+                    results[name]["error"] = f"Skipped because {', '.join(blocked)} did not complete"
+                    changed = True
+
+    def _critical_path(self, results):
+        """
+        Longest chain of dependent stages by wall time.
+        """
+        finish = {}
+        parent = {}
+        def longest(name):
+            if name not in finish:
+                best_dep = None
+                best = 0.0
+                for dep in self.stages[name].deps:
+                    if longest(dep) > best:
+                        best = longest(dep)
+                        best_dep = dep
+                finish[name] = best + (results[name]["duration"] or 0.0)
+                parent[name] = best_dep
+            return finish[name]
+        if not self.stages:
+            return [], 0.0
+        end = max(self.stages, key=longest)
+        path = []
+        while end is not None:
+            path.append(end)
+            end = parent[end]
+        path.reverse()
+        return path, finish[path[-1]]
+
+    def _log_report(self, report):
+        for name, entry in sorted(report["stages"].items(), key=lambda item: item[1]["duration"] or 0.0, reverse=True):
+            duration = entry["duration"]
+            duration = f"{duration:.3f}s" if duration is not None else "-"
+            logging.info(f"Stage {name}: {entry['status']} in {duration}")
+        logging.info(f"Stages finished in {report['total_time']:.3f}s, critical path "
+                     f"{' -> '.join(report['critical_path'])} ({report['critical_path_time']:.3f}s)")